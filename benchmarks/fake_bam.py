@@ -0,0 +1,393 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+A stand-in for the BAM REST v2 API, serving a generated data set, for load
+testing the example workflows without a live Address Manager.
+
+Only the resources and query parameters used by the workflows are implemented.
+Besides ``/api/v2``, the server exposes ``/_stats`` (GET to read the number of
+requests it served, POST to reset it) and ``/_dataset`` (the IDs of the
+generated objects).
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = "/api/v2"
+
+#: The link to the collection of children of each type of object.
+CHILD_LINKS = {
+    "Configuration": "views",
+    "View": "zones",
+    "Zone": "resourceRecords",
+}
+
+_EQ_FILTER = re.compile(r"^(\w+):eq\('([^']*)'\)$")
+_IN_FILTER = re.compile(r"^id:in\(([\d,]*)\)$")
+_ID_FILTER = re.compile(r"^id:(\d+)$")
+
+
+class Dataset:
+    """
+    The objects served by the fake server.
+
+    :param configurations: The number of configurations.
+    :param views: The number of views per configuration.
+    :param zones: The number of zones per view.
+    :param records: The number of TXT records per zone.
+    """
+
+    def __init__(self, configurations, views, zones, records):
+        self._ids = itertools.count(100001)
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.children = {}
+        self.configurations = []
+        for i in range(configurations):
+            self.add(None, "Configuration", f"config-{i}")
+        for configuration in list(self.configurations):
+            for i in range(views):
+                view = self.add(configuration["id"], "View", f"view-{i}")
+                for j in range(zones):
+                    zone = self.add(view["id"], "Zone", f"zone-{j}.example")
+                    for k in range(records):
+                        self.add(
+                            zone["id"], "TXTRecord", f"txt-{k:06d}", text=f"v=test{k}"
+                        )
+
+    def add(self, parent_id, object_type, name, **fields):
+        """
+        Add an object.
+
+        :param parent_id: The ID of the parent object.
+        :param object_type: The type of the object.
+        :param name: The name of the object.
+        :return: The new object.
+        """
+        with self.lock:
+            obj = {"id": next(self._ids), "type": object_type, "name": name}
+            obj.update(fields)
+            self.objects[obj["id"]] = obj
+            self.children[obj["id"]] = []
+            if parent_id is not None:
+                obj["_parent"] = parent_id
+                self.children[parent_id].append(obj["id"])
+            elif object_type == "Configuration":
+                self.configurations.append(obj)
+        return obj
+
+    def remove(self, object_id):
+        """
+        Remove an object.
+
+        :param object_id: The ID of the object.
+        :return: Whether the object existed.
+        """
+        with self.lock:
+            obj = self.objects.pop(object_id, None)
+            if obj is None:
+                return False
+            if "_parent" in obj:
+                self.children[obj["_parent"]].remove(object_id)
+            elif obj in self.configurations:
+                self.configurations.remove(obj)
+        return True
+
+    def list_children(self, parent_id):
+        """
+        Get the children of an object.
+
+        :param parent_id: The ID of the parent object.
+        :return: The children, or ``None`` if the parent does not exist.
+        """
+        with self.lock:
+            if parent_id not in self.objects:
+                return None
+            return [self.objects[i] for i in self.children[parent_id]]
+
+    def summary(self):
+        """
+        Get the IDs of the generated objects, grouped by type.
+
+        :return: A dictionary of lists of IDs by type.
+        """
+        result = {}
+        with self.lock:
+            for obj in self.objects.values():
+                result.setdefault(obj["type"], []).append(obj["id"])
+        return result
+
+
+def apply_query(objects, query):
+    """
+    Apply the ``filter``, ``orderBy``, ``offset`` and ``limit`` query parameters.
+
+    :param objects: The objects of the collection.
+    :param query: The parsed query string.
+    :return: The selected objects.
+    """
+    for clause in query.get("filter", [""])[0].split(" and "):
+        clause = clause.strip()
+        match = _EQ_FILTER.match(clause)
+        if match:
+            field, value = match.groups()
+            objects = [o for o in objects if str(o.get(field)) == value]
+            continue
+        match = _IN_FILTER.match(clause) or _ID_FILTER.match(clause)
+        if match:
+            ids = {int(i) for i in match.group(1).split(",") if i}
+            objects = [o for o in objects if o["id"] in ids]
+    order = query.get("orderBy", [""])[0]
+    if order.startswith("desc(") or order.startswith("asc("):
+        field = order[order.index("(") + 1 : -1]
+        objects = sorted(
+            objects,
+            key=lambda o: str(o.get(field) or ""),
+            reverse=order.startswith("desc("),
+        )
+    offset = int(query.get("offset", ["0"])[0])
+    limit = int(query.get("limit", ["1000"])[0])
+    return objects[offset : offset + limit]
+
+
+def public(obj):
+    """
+    Get the representation of an object returned to clients.
+
+    :param obj: The object.
+    :return: The object, without internal fields and with HAL links.
+    """
+    data = {key: value for key, value in obj.items() if not key.startswith("_")}
+    links = {"self": {"href": f"{API_PREFIX}/objects/{obj['id']}"}}
+    if "_parent" in obj:
+        links["up"] = {"href": f"{API_PREFIX}/objects/{obj['_parent']}"}
+    rel = CHILD_LINKS.get(obj.get("type"))
+    if rel:
+        links[rel] = {"href": f"{API_PREFIX}/objects/{obj['id']}/{rel}"}
+    data["_links"] = links
+    return data
+
+
+class FakeBAMHandler(BaseHTTPRequestHandler):
+    """Handles the requests to the fake server."""
+
+    server_version = "FakeBAM/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _send(self, status, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        path = url.path
+        query = parse_qs(url.query)
+        server = self.server
+        if path == "/_stats":
+            if method == "POST":
+                server.reset_stats()
+            return self._send(200, server.stats())
+        if path == "/_dataset":
+            return self._send(200, server.dataset.summary())
+        if not path.startswith(API_PREFIX):
+            return self._send(404, {"message": "Not found"})
+        path = path[len(API_PREFIX) :].rstrip("/") or "/"
+
+        server.count_request()
+        if server.latency:
+            time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+        if random.random() < server.error_rate:
+            return self._send(503, {"message": "Injected failure"})
+        return self._route(method, path, query)
+
+    def _route(self, method, path, query):
+        dataset = self.server.dataset
+        parts = path.strip("/").split("/")
+        if method == "POST" and path == "/sessions":
+            return self._send(201, {"basicAuthenticationCredentials": "ZmFrZTpmYWtl"})
+        if path == "/":
+            objects = list(dataset.objects.values())
+            return self._collection(apply_query(objects, query))
+        if path == "/configurations":
+            if method == "POST":
+                body = self._read_json()
+                return self._send(
+                    201,
+                    public(dataset.add(None, "Configuration", body.get("name"))),
+                )
+            with dataset.lock:
+                configurations = list(dataset.configurations)
+            return self._collection(apply_query(configurations, query))
+        if len(parts) == 3 and parts[2] in ("views", "zones", "resourceRecords"):
+            parent_id = int(parts[1])
+            if method == "POST":
+                body = self._read_json()
+                fields = {"text": body.get("text")}
+                obj = dataset.add(
+                    parent_id, body.get("type"), body.get("name"), **fields
+                )
+                obj["absoluteName"] = body.get("absoluteName")
+                return self._send(201, public(obj))
+            children = dataset.list_children(parent_id)
+            if children is None:
+                return self._send(404, {"message": "Object was not found"})
+            return self._collection(apply_query(children, query))
+        if len(parts) == 2 and parts[0] in (
+            "configurations",
+            "resourceRecords",
+            "objects",
+        ):
+            return self._object(method, int(parts[1]))
+        return self._send(404, {"message": "Not found"})
+
+    def _object(self, method, object_id):
+        dataset = self.server.dataset
+        obj = dataset.objects.get(object_id)
+        if obj is None:
+            return self._send(404, {"message": "Object was not found"})
+        if method == "DELETE":
+            dataset.remove(object_id)
+            return self._send(204)
+        if method in ("PUT", "PATCH"):
+            body = self._read_json()
+            with dataset.lock:
+                for key, value in body.items():
+                    if key not in ("id", "type") and not key.startswith("_"):
+                        obj[key] = value
+        return self._send(200, public(obj))
+
+    def _collection(self, objects):
+        data = [public(obj) for obj in objects]
+        return self._send(200, {"count": len(data), "data": data})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a GET request."""
+        self._handle("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a POST request."""
+        self._handle("POST")
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        """Handle a PUT request."""
+        self._handle("PUT")
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        """Handle a PATCH request."""
+        self._handle("PATCH")
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        """Handle a DELETE request."""
+        self._handle("DELETE")
+
+
+class FakeBAMServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server serving a data set with injectable latency.
+
+    :param address: The address to listen on.
+    :param dataset: The data set to serve.
+    :param latency: The mean delay added to each API request, in seconds.
+    :param jitter: The standard deviation of the delay, in seconds.
+    :param error_rate: The fraction of API requests that fail with 503.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, dataset, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__(address, FakeBAMHandler)
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._requests = 0
+        self._stats_lock = threading.Lock()
+
+    def count_request(self):
+        """Count a served API request."""
+        with self._stats_lock:
+            self._requests += 1
+
+    def reset_stats(self):
+        """Reset the number of served API requests."""
+        with self._stats_lock:
+            self._requests = 0
+
+    def stats(self):
+        """
+        Get the statistics of the server.
+
+        :return: A dictionary with the number of served API requests.
+        """
+        with self._stats_lock:
+            return {"requests": self._requests}
+
+
+def main():
+    """Run the fake server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--configurations", type=int, default=2)
+    parser.add_argument("--views", type=int, default=2)
+    parser.add_argument("--zones", type=int, default=20)
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    dataset = Dataset(args.configurations, args.views, args.zones, args.records)
+    server = FakeBAMServer(
+        (args.host, args.port),
+        dataset,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving {len(dataset.objects)} objects on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
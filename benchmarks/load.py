@@ -0,0 +1,520 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Load test of the example workflows running in a Gateway instance.
+
+Each scenario drives one workflow route with a fixed number of requests at a
+given concurrency and reports the latency percentiles, the throughput, and,
+when Gateway is connected to ``fake_bam.py``, the number of BAM requests made
+per route request.
+"""
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+
+class Scenario:
+    """
+    A request to a workflow route, repeated during the load test.
+
+    :param name: The name of the scenario.
+    :param method: The HTTP method.
+    :param path: The path, or a callable without arguments that returns it.
+    :param form: The form data, or a callable without arguments that returns it.
+    :param files: The uploaded files as a dictionary of a field name to a tuple of
+        a file name and the content.
+    :param requests: The maximum number of requests of the scenario, if it should
+        make fewer than the other scenarios.
+    :param until: For responses that stream for a long time, the start of the
+        line after which the response is no longer read.
+    """
+
+    def __init__(
+        self, name, method, path, form=None, files=None, requests=None, until=None
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.form = form
+        self.files = files
+        self.requests = requests
+        self.until = until
+
+    def build(self, base_url, headers):
+        """
+        Build the next request of the scenario.
+
+        :param base_url: The URL of the Gateway instance.
+        :param headers: The headers to add to the request.
+        :return: The request.
+        """
+        path = self.path() if callable(self.path) else self.path
+        form = self.form() if callable(self.form) else self.form
+        headers = dict(headers)
+        data = None
+        if self.files:
+            data, content_type = encode_multipart(form or {}, self.files)
+            headers["Content-Type"] = content_type
+        elif form is not None:
+            data = urlencode(form).encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return Request(base_url + path, data=data, headers=headers, method=self.method)
+
+
+def encode_multipart(form, files):
+    """
+    Encode form data and files as ``multipart/form-data``.
+
+    :param form: The form fields.
+    :param files: The files as a dictionary of a field name to a tuple of a file
+        name and the content.
+    :return: A tuple of the body and the content type.
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in form.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n".encode("utf-8")
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: application/octet-stream'
+            f"\r\n\r\n".encode("utf-8") + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def get_json(url, method="GET"):
+    """
+    Make a request and parse the JSON response.
+
+    :param url: The URL.
+    :param method: The HTTP method.
+    :return: The parsed response.
+    """
+    with urlopen(Request(url, method=method), timeout=30) as response:
+        return json.loads(response.read())
+
+
+def post_form(url, form, headers):
+    """
+    Make a POST request with form data and parse the JSON response.
+
+    :param url: The URL.
+    :param form: The form fields.
+    :param headers: The headers to add to the request.
+    :return: The parsed response.
+    """
+    headers = {**headers, "Content-Type": "application/x-www-form-urlencoded"}
+    data = urlencode(form).encode("utf-8")
+    request = Request(url, data=data, headers=headers, method="POST")
+    with urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def take(iterator, count):
+    """
+    Take the next items of an iterator.
+
+    :param iterator: The iterator.
+    :param count: The number of items.
+    :return: The list of items.
+    :raises StopIteration: If the iterator has fewer items left.
+    """
+    items = list(itertools.islice(iterator, count))
+    if len(items) < count:
+        raise StopIteration
+    return items
+
+
+#: The number of records deleted by each request of ``dtr_bulk_delete``.
+BULK_DELETE_SIZE = 5
+
+#: The number of requests of the scenarios that keep a stream open.
+STREAM_REQUESTS = 20
+
+
+def build_scenarios(ids, requests, submit):
+    """
+    Build the scenarios that drive every route of the example workflows.
+
+    :param ids: The IDs of the objects of the fake BAM data set, by type.
+    :param requests: The number of requests of each scenario.
+    :param submit: A callable that receives the path of a route and form data,
+        makes a POST request to Gateway and returns the parsed response.
+    :return: The list of scenarios.
+    """
+    configuration = ids["Configuration"][0]
+    view = ids["View"][0]
+    zone = ids["Zone"][0]
+    zone_records = itertools.cycle(ids["TXTRecord"][:1000])
+    # NOTE: Writes target records outside of the zone that is listed, so that
+    # they do not disturb the read scenarios. Each record can only be deleted
+    # once.
+    needed = requests * (1 + BULK_DELETE_SIZE)
+    doomed_records = iter(ids["TXTRecord"][::-1][:needed])
+    if len(ids["TXTRecord"]) < needed:
+        print(
+            f"The data set has fewer than the {needed} TXT records the delete "
+            "scenarios need; they report errors once the records run out.",
+            file=sys.stderr,
+        )
+    names = (f"bench-{i}" for i in itertools.count())
+    zone_name = "zone-0.example"
+    csv_rows = "\n".join(f"bulk-{i},bench" for i in range(50))
+    desired_rows = "\n".join(f"txt-{i:06d},v=test{i}" for i in range(100))
+    job = {}
+
+    def job_id():
+        # A single job, whose status is looked up by every request.
+        if "id" not in job:
+            job["id"] = submit(
+                f"{atr}/",
+                {
+                    "zone_id": zone,
+                    "zone_name": zone_name,
+                    "name": next(names),
+                    "text": "bench",
+                    "async": "true",
+                },
+            )["job"]["id"]
+        return job["id"]
+
+    atr = "/add_text_record"
+    utr = "/manage_text_record/update_text_record"
+    dtr = "/manage_text_record/delete_text_record"
+    cd = "/configuration_details"
+    god = "/get_object_details"
+    return [
+        Scenario("atr_page", "GET", f"{atr}/"),
+        Scenario("atr_configurations", "GET", f"{atr}/configurations"),
+        Scenario("atr_views", "GET", f"{atr}/views?configuration={configuration}"),
+        Scenario("atr_zones", "GET", f"{atr}/zones?view={view}"),
+        Scenario("atr_hierarchy", "GET", f"{atr}/hierarchy?depth=3"),
+        Scenario(
+            "atr_search", "GET", f"{atr}/search?kind=zones&parent={view}&q=zone-1"
+        ),
+        Scenario(
+            "atr_add",
+            "POST",
+            f"{atr}/",
+            lambda: {
+                "zone_id": zone,
+                "zone_name": zone_name,
+                "name": next(names),
+                "text": "bench",
+            },
+        ),
+        Scenario(
+            "atr_bulk",
+            "POST",
+            f"{atr}/bulk",
+            {"zone_id": zone, "zone_name": zone_name},
+            files={"file": ("records.csv", f"name,text\n{csv_rows}\n".encode())},
+        ),
+        Scenario("atr_job", "GET", lambda: f"{atr}/jobs/{job_id()}"),
+        Scenario("utr_page", "GET", f"{utr}"),
+        Scenario("utr_configurations", "GET", f"{utr}/configurations"),
+        Scenario("utr_views", "GET", f"{utr}/views?configuration={configuration}"),
+        Scenario("utr_zones", "GET", f"{utr}/zones?view={view}"),
+        Scenario(
+            "utr_hierarchy",
+            "GET",
+            f"{utr}/hierarchy?depth=3&configuration={configuration}&view={view}",
+        ),
+        Scenario("utr_records", "GET", f"{utr}/records?zone={zone}"),
+        Scenario("utr_records_page", "GET", f"{utr}/records?zone={zone}&cursor="),
+        Scenario("utr_records_stream", "POST", f"{utr}/records/stream", {"zone": zone}),
+        Scenario(
+            "utr_records_export", "GET", f"{utr}/records/export?zone={zone}&format=csv"
+        ),
+        Scenario(
+            "utr_view_export", "GET", f"{utr}/records/export?view={view}&format=jsonl"
+        ),
+        Scenario(
+            "utr_record_changes",
+            "GET",
+            f"{utr}/records/changes?zone={zone}",
+            requests=STREAM_REQUESTS,
+            until=b"event:",
+        ),
+        Scenario(
+            "utr_search", "GET", f"{utr}/search?kind=records&parent={zone}&q=txt-0001"
+        ),
+        Scenario(
+            "utr_update",
+            "POST",
+            f"{utr}/update",
+            lambda: {
+                "zoneName": zone_name,
+                "recordID": next(zone_records),
+                "newName": next(names),
+                "newText": "bench",
+            },
+        ),
+        # NOTE: Only the plan is requested, since repeating a reconciliation
+        # that was performed does not write anything.
+        Scenario(
+            "utr_reconcile",
+            "POST",
+            f"{utr}/reconcile",
+            {"zone": zone, "zoneName": zone_name, "dryRun": "true"},
+            files={"file": ("records.csv", f"name,text\n{desired_rows}\n".encode())},
+        ),
+        Scenario("utr_job", "GET", lambda: f"{utr}/jobs/{job_id()}"),
+        Scenario("dtr_page", "GET", f"{dtr}"),
+        Scenario("dtr_configurations", "GET", f"{dtr}/configurations"),
+        Scenario("dtr_views", "GET", f"{dtr}/views?configuration={configuration}"),
+        Scenario("dtr_zones", "GET", f"{dtr}/zones?view={view}"),
+        Scenario("dtr_hierarchy", "GET", f"{dtr}/hierarchy?depth=2"),
+        Scenario("dtr_records", "GET", f"{dtr}/records?zone={zone}"),
+        Scenario("dtr_records_stream", "POST", f"{dtr}/records/stream", {"zone": zone}),
+        Scenario(
+            "dtr_records_export",
+            "GET",
+            f"{dtr}/records/export?zone={zone}&format=jsonl",
+        ),
+        Scenario(
+            "dtr_record_changes",
+            "GET",
+            f"{dtr}/records/changes?zone={zone}",
+            requests=STREAM_REQUESTS,
+            until=b"event:",
+        ),
+        Scenario("dtr_search", "GET", f"{dtr}/search?kind=records&parent={zone}&q=txt"),
+        Scenario(
+            "dtr_delete", "DELETE", lambda: f"{dtr}/delete/{next(doomed_records)}"
+        ),
+        Scenario(
+            "dtr_bulk_delete",
+            "POST",
+            f"{dtr}/delete",
+            lambda: {
+                "recordIDs": ",".join(
+                    str(record_id)
+                    for record_id in take(doomed_records, BULK_DELETE_SIZE)
+                )
+            },
+        ),
+        Scenario("dtr_job", "GET", lambda: f"{dtr}/jobs/{job_id()}"),
+        Scenario("cd_page", "GET", f"{cd}/"),
+        Scenario("cd_configurations", "GET", f"{cd}/get_configurations"),
+        Scenario(
+            "cd_add",
+            "POST",
+            f"{cd}/add_configuration",
+            lambda: {"name": next(names), "description": ""},
+        ),
+        Scenario(
+            "cd_update",
+            "PUT",
+            f"{cd}/update_configuration",
+            lambda: {
+                "configuration": json.dumps(
+                    {"id": configuration, "name": "config-0", "_links": {}}
+                )
+            },
+        ),
+        Scenario("god_page", "GET", f"{god}/"),
+        Scenario("god_object", "GET", f"{god}/object?objectId={zone}"),
+        Scenario(
+            "god_objects",
+            "POST",
+            f"{god}/objects",
+            {"objectIds": ",".join(str(i) for i in ids["Zone"][:200])},
+        ),
+        Scenario("god_graph", "GET", f"{god}/object/graph?objectId={view}&depth=2"),
+    ]
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile of sorted values, using the nearest-rank method.
+
+    :param values: The sorted values.
+    :param fraction: The percentile as a fraction, e.g., ``0.95``.
+    :return: The percentile.
+    """
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def read_response(response, until=None):
+    """
+    Read a response.
+
+    :param response: The response.
+    :param until: The start of the line after which the response is no longer
+        read. The whole response is read if not specified.
+    """
+    if until is None:
+        response.read()
+        return
+    for line in response:
+        if line.startswith(until):
+            return
+
+
+def run_scenario(scenario, args, headers):
+    """
+    Run the requests of a scenario.
+
+    :param scenario: The scenario.
+    :param args: The parsed command line arguments.
+    :param headers: The headers to add to each request.
+    :return: A dictionary with the results.
+    """
+    lock = threading.Lock()
+
+    def send(_):
+        try:
+            with lock:
+                request = scenario.build(args.gateway, headers)
+        except (URLError, OSError, StopIteration):
+            # The scenario ran out of objects to write, or could not be set up.
+            # Nothing was sent, so there is no latency to report.
+            return None, 0
+        start = time.perf_counter()
+        try:
+            with urlopen(request, timeout=args.timeout) as response:
+                read_response(response, scenario.until)
+                status = response.status
+        except HTTPError as e:
+            status = e.code
+        except (URLError, OSError):
+            status = 0
+        return time.perf_counter() - start, status
+
+    requests = min(args.requests, scenario.requests or args.requests)
+    if args.fake_bam:
+        get_json(f"{args.fake_bam}/_stats", method="POST")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    bam_requests = None
+    if args.fake_bam:
+        bam_requests = get_json(f"{args.fake_bam}/_stats")["requests"]
+
+    latencies = sorted(latency for latency, _ in outcomes if latency is not None)
+    errors = sum(1 for _, status in outcomes if not 200 <= status < 400)
+    return {
+        "scenario": scenario.name,
+        "requests": len(outcomes),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rps": len(outcomes) / elapsed if elapsed else float("nan"),
+        "bam_per_request": (
+            bam_requests / len(outcomes) if bam_requests is not None else None
+        ),
+    }
+
+
+def print_report(results):
+    """
+    Print the results as a table.
+
+    :param results: The results of the scenarios.
+    """
+    print(
+        f"{'scenario':<22}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'req/s':>10}{'BAM/req':>9}"
+    )
+    for result in results:
+        bam = result["bam_per_request"]
+        print(
+            f"{result['scenario']:<22}{result['requests']:>6}{result['errors']:>6}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['p99_ms']:>10.1f}{result['rps']:>10.1f}"
+            f"{'-' if bam is None else format(bam, '.2f'):>9}"
+        )
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gateway", default="http://localhost:8001")
+    parser.add_argument("--fake-bam", default="http://127.0.0.1:8443")
+    parser.add_argument(
+        "--cookie", default="", help="The session cookie of a logged in Gateway user."
+    )
+    parser.add_argument(
+        "--header",
+        action="append",
+        default=[],
+        help="An additional request header as 'Name: value'. Can be repeated.",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--only", default="", help="A regular expression selecting scenarios."
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the results as JSON lines."
+    )
+    args = parser.parse_args()
+    args.gateway = args.gateway.rstrip("/")
+    args.fake_bam = args.fake_bam.rstrip("/")
+
+    headers = dict(header.split(": ", 1) for header in args.header)
+    if args.cookie:
+        headers["Cookie"] = args.cookie
+    try:
+        ids = get_json(f"{args.fake_bam}/_dataset")
+    except (URLError, OSError) as e:
+        sys.exit(f"Cannot reach the fake BAM server at {args.fake_bam}: {e}")
+
+    selected = re.compile(args.only)
+    results = []
+    scenarios = build_scenarios(
+        ids,
+        args.requests,
+        lambda path, form: post_form(args.gateway + path, form, headers),
+    )
+    for scenario in scenarios:
+        if not selected.search(scenario.name):
+            continue
+        result = run_scenario(scenario, args, headers)
+        results.append(result)
+        if args.json:
+            print(json.dumps(result), flush=True)
+    if not args.json:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
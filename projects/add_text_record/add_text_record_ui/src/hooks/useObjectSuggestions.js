@@ -20,13 +20,40 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 */
 
-import { useCallback, useMemo } from 'react';
+import { useCallback, useEffect, useMemo, useState } from 'react';
+import { doGet } from '@bluecateng/limani';
 
-export default (values, setError, errorText, disable) => {
+const SEARCH_DELAY = 250;
+
+export default (values, setError, errorText, disable, searchUrl, text) => {
+    const [found, setFound] = useState(null);
     const names = useMemo(
         () => values.map(({ id, name }) => ({ id, name })),
         [values],
     );
+
+    // Ask the server for the matching names once the user stops typing, so
+    // that long lists do not have to be filtered in the browser.
+    useEffect(() => {
+        setFound(null);
+        if (!searchUrl || disable || !text) {
+            return undefined;
+        }
+
+        let current = true;
+        const timeout = setTimeout(() => {
+            const params = new URLSearchParams({ q: text });
+            doGet(`${searchUrl}&${params}`).then(
+                ({ results }) => current && setFound({ text, results }),
+                () => null,
+            );
+        }, SEARCH_DELAY);
+        return () => {
+            current = false;
+            clearTimeout(timeout);
+        };
+    }, [searchUrl, disable, text]);
+
     return useCallback(
         (text) => {
             if (disable) {
@@ -34,7 +61,11 @@ export default (values, setError, errorText, disable) => {
             }
 
             const textLower = text.toLowerCase();
-            const suggestions = names.filter(({ name }) =>
+            const candidates =
+                found && textLower.includes(found.text.toLowerCase())
+                    ? found.results
+                    : names;
+            const suggestions = candidates.filter(({ name }) =>
                 name.toLowerCase().includes(textLower),
             );
             if (!suggestions.length) {
@@ -52,6 +83,6 @@ export default (values, setError, errorText, disable) => {
                 })
                 .map(({ id, name }) => ({ id, name }));
         },
-        [names, values, setError, errorText, disable],
+        [found, names, values, setError, errorText, disable],
     );
 };
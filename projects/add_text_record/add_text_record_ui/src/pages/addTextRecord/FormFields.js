@@ -23,7 +23,7 @@ SOFTWARE.
 import { useCallback, useEffect, useState } from 'react';
 import { FormTextInput } from '@bluecateng/pelagos-forms';
 import { useFormField } from '@bluecateng/auto-forms';
-import { doPost, resetForm } from '@bluecateng/limani';
+import { doGet, resetForm } from '@bluecateng/limani';
 import FormComboBoxField from '../../components/FormComboBoxField';
 
 export const FormFields = ({ initialFormData }) => {
@@ -74,9 +74,10 @@ export const FormFields = ({ initialFormData }) => {
                 configurations.find((value) => {
                     return value.name === selectedConfiguration.name;
                 })?.id ?? '';
-            const payload = new FormData();
-            payload.append('configuration', configurationID);
-            doPost('/add_text_record/views', payload).then((data) => {
+            const params = new URLSearchParams({
+                configuration: configurationID,
+            });
+            doGet(`/add_text_record/views?${params}`).then((data) => {
                 setViews(data.views.length === 0 ? [] : data.views);
             });
         } else {
@@ -92,10 +93,9 @@ export const FormFields = ({ initialFormData }) => {
             const viewID = views.find((value) => {
                 return value.name === selectedView.name;
             }).id;
-            const payload = new FormData();
-            payload.append('view', viewID);
+            const params = new URLSearchParams({ view: viewID });
 
-            doPost('/add_text_record/zones', payload).then((data) => {
+            doGet(`/add_text_record/zones?${params}`).then((data) => {
                 setZones(data.zones.length === 0 ? [] : data.zones);
             });
         } else {
@@ -110,6 +110,7 @@ export const FormFields = ({ initialFormData }) => {
                 name='configuration'
                 label='Configuration'
                 values={configurations}
+                searchUrl='/add_text_record/search?kind=configurations'
                 noMatchText='No matching configuration was found'
                 placeholder='Start typing to search for a Configuration'
                 required={true}
@@ -120,6 +121,10 @@ export const FormFields = ({ initialFormData }) => {
                 name='view'
                 label='View'
                 values={views}
+                searchUrl={
+                    selectedConfiguration &&
+                    `/add_text_record/search?kind=views&parent=${selectedConfiguration.id}`
+                }
                 disabled={!selectedConfiguration}
                 noMatchText='No matching view was found'
                 placeholder='Start typing to search for a View'
@@ -131,6 +136,10 @@ export const FormFields = ({ initialFormData }) => {
                 name='zone'
                 label='Zone'
                 values={zones}
+                searchUrl={
+                    selectedView &&
+                    `/add_text_record/search?kind=zones&parent=${selectedView.id}`
+                }
                 disabled={!selectedView}
                 noMatchText='No matching zone was found'
                 placeholder='Start typing to search for a Zone'
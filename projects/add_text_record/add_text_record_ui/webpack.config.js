@@ -34,8 +34,8 @@ module.exports = [
                 '../../../workspace/workflows/add_text_record/',
             ),
             publicPath: '/add_text_record/',
-            filename: 'js/[name].js',
-            assetModuleFilename: 'img/[name][ext]',
+            filename: 'js/[name].[contenthash].js',
+            assetModuleFilename: 'img/[name].[contenthash][ext]',
         },
         mode: process.env.NODE_ENV || 'development',
         resolve: {
@@ -118,7 +118,9 @@ const Content = () => {
     // runs on page load to get data from flask app
     useEffect(() => {
         setBusy(true);
-        doGet('/configuration_details/get_configurations')
+        doGet(
+            '/configuration_details/get_configurations?fields=name,description',
+        )
             .then((data) => {
                 setResData(data);
             })
@@ -136,6 +138,7 @@ const Content = () => {
 
         const payload = new FormData();
         payload.append('configuration', JSON.stringify(values));
+        payload.append('original', JSON.stringify(selectedRowDetails));
 
         doPut('/configuration_details/update_configuration', payload)
             .then((data) => {
@@ -33,8 +33,8 @@ module.exports = [
                 '../../../workspace/workflows/configuration_details/',
             ),
             publicPath: '/configuration_details/',
-            filename: 'js/[name].js',
-            assetModuleFilename: 'img/[name][ext]',
+            filename: 'js/[name].[contenthash].js',
+            assetModuleFilename: 'img/[name].[contenthash][ext]',
         },
         mode: process.env.NODE_ENV || 'development',
         resolve: {
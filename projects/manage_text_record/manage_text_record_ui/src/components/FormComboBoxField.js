@@ -38,6 +38,7 @@ const FormComboBoxField = ({
     label,
     required,
     values,
+    searchUrl,
     noMatchText,
     ...props
 }) => {
@@ -50,6 +51,8 @@ const FormComboBoxField = ({
         setError,
         noMatchText,
         !extra,
+        searchUrl,
+        extra,
     );
     const handleChange = useCallback(
         (object) => (setValue(object), setError(null), setExtra(null)),
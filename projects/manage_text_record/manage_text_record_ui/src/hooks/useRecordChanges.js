@@ -0,0 +1,85 @@
+/*
+Copyright 2024 BlueCat Networks Inc.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+*/
+
+import { useEffect } from 'react';
+
+const RETRY_DELAY = 60000;
+
+const withDisplayName = (rec) => ({
+    ...rec,
+    id: parseInt(rec.id),
+    displayName: rec.name ? rec.name : 'Same as zone named text record',
+});
+
+/**
+ * Patches the list of records of a zone in place with the changes streamed by
+ * the server, and reloads it when the server no longer has the changes since
+ * the last one received.
+ */
+export default (page, zoneID, setRecords, reload) => {
+    useEffect(() => {
+        if (!zoneID || typeof EventSource === 'undefined') {
+            return undefined;
+        }
+
+        const params = new URLSearchParams({ zone: zoneID });
+        const upsert = (event) => {
+            const rec = withDisplayName(JSON.parse(event.data));
+            setRecords((records) =>
+                records.some((value) => value.id === rec.id)
+                    ? records.map((value) =>
+                          value.id === rec.id ? rec : value,
+                      )
+                    : [...records, rec],
+            );
+        };
+        const remove = (event) => {
+            const id = parseInt(JSON.parse(event.data).id);
+            setRecords((records) =>
+                records.filter((value) => value.id !== id),
+            );
+        };
+        let source = null;
+        let timeout = null;
+        const open = () => {
+            source = new EventSource(
+                `/manage_text_record/${page}/records/changes?${params}`,
+            );
+            source.addEventListener('add', upsert);
+            source.addEventListener('change', upsert);
+            source.addEventListener('remove', remove);
+            source.addEventListener('reset', reload);
+            // The browser gives up when the server is too busy to open the
+            // stream, so try again later.
+            source.addEventListener('error', () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    timeout = setTimeout(open, RETRY_DELAY);
+                }
+            });
+        };
+        open();
+        return () => {
+            clearTimeout(timeout);
+            source.close();
+        };
+    }, [page, zoneID]);
+};
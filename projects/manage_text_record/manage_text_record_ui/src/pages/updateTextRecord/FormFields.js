@@ -37,8 +37,9 @@ import {
 } from '@bluecateng/pelagos';
 import { FormTextInput } from '@bluecateng/pelagos-forms';
 import { useFormField } from '@bluecateng/auto-forms';
-import { doPost, resetForm } from '@bluecateng/limani';
+import { doGet, resetForm } from '@bluecateng/limani';
 import FormComboBoxField from '../../components/FormComboBoxField';
+import useRecordChanges from '../../hooks/useRecordChanges';
 
 export const FormFields = ({ initialFormData }) => {
     resetForm(initialFormData);
@@ -73,6 +74,7 @@ export const FormFields = ({ initialFormData }) => {
     const [views, setViews] = useState([]);
     const [zones, setZones] = useState([]);
     const [records, setRecords] = useState([]);
+    const [zoneID, setZoneID] = useState(null);
     const [filteredRecords, setFilteredRecords] = useState([]);
 
     // filterText is used by the search bar on top of the table
@@ -98,11 +100,11 @@ export const FormFields = ({ initialFormData }) => {
                 configurations.find((value) => {
                     return value.name === selectedConfiguration.name;
                 })?.id ?? '';
-            const payload = new FormData();
-            payload.append('configuration', configurationID);
-            doPost(
-                '/manage_text_record/update_text_record/views',
-                payload,
+            const params = new URLSearchParams({
+                configuration: configurationID,
+            });
+            doGet(
+                `/manage_text_record/update_text_record/views?${params}`,
             ).then((data) => {
                 setViews(data.views.length === 0 ? [] : data.views);
             });
@@ -121,12 +123,10 @@ export const FormFields = ({ initialFormData }) => {
             const viewID = views.find((value) => {
                 return value.name === selectedView.name;
             }).id;
-            const payload = new FormData();
-            payload.append('view', viewID);
+            const params = new URLSearchParams({ view: viewID });
 
-            doPost(
-                '/manage_text_record/update_text_record/zones',
-                payload,
+            doGet(
+                `/manage_text_record/update_text_record/zones?${params}`,
             ).then((data) => {
                 setZones(data.zones.length === 0 ? [] : data.zones);
             });
@@ -138,29 +138,40 @@ export const FormFields = ({ initialFormData }) => {
         setSelectedRecordText('');
     }, [selectedView, selectedConfiguration]);
 
+    const loadRecords = (id) => {
+        const params = new URLSearchParams({ zone: id });
+
+        doGet(`/manage_text_record/update_text_record/records?${params}`)
+            .then((data) => {
+                data.records.map(
+                    (rec) =>
+                        (rec.displayName = rec.name
+                            ? rec.name
+                            : 'Same as zone named text record'),
+                );
+                setRecords(data.records.length === 0 ? [] : data.records);
+            })
+            .finally(() => {
+                setFilterText('');
+            });
+    };
+
+    // Records added, changed or removed while the zone is shown are patched
+    // into the list instead of loading it again.
+    useRecordChanges('update_text_record', zoneID, setRecords, () =>
+        loadRecords(zoneID),
+    );
+
     useEffect(() => {
         if (selectedView && selectedConfiguration && selectedZone) {
             setSelectedRecord({});
-            const zoneID = zones.find((value) => {
+            const selectedZoneID = zones.find((value) => {
                 return value.name === selectedZone.name;
             }).id;
-            const payload = new FormData();
-            payload.append('zone', zoneID);
-
-            doPost('/manage_text_record/update_text_record/records', payload)
-                .then((data) => {
-                    data.records.map(
-                        (rec) =>
-                            (rec.displayName = rec.name
-                                ? rec.name
-                                : 'Same as zone named text record'),
-                    );
-                    setRecords(data.records.length === 0 ? [] : data.records);
-                })
-                .finally(() => {
-                    setFilterText('');
-                });
+            setZoneID(selectedZoneID);
+            loadRecords(selectedZoneID);
         } else {
+            setZoneID(null);
             setRecords([]);
         }
         setSelectedRecordName('');
@@ -228,6 +239,7 @@ export const FormFields = ({ initialFormData }) => {
                 className='UpdateTextRecordForm__configuration'
                 label='Configuration'
                 values={configurations}
+                searchUrl='/manage_text_record/update_text_record/search?kind=configurations'
                 noMatchText='No matching configuration was found'
                 placeholder='Start typing to search for a Configuration'
                 required={true}
@@ -239,6 +251,10 @@ export const FormFields = ({ initialFormData }) => {
                 className='UpdateTextRecordForm__view'
                 label='View'
                 values={views}
+                searchUrl={
+                    selectedConfiguration &&
+                    `/manage_text_record/update_text_record/search?kind=views&parent=${selectedConfiguration.id}`
+                }
                 disabled={!selectedConfiguration}
                 noMatchText='No matching view was found'
                 placeholder='Start typing to search for a View'
@@ -251,6 +267,10 @@ export const FormFields = ({ initialFormData }) => {
                 className='UpdateTextRecordForm__zone'
                 label='Zone'
                 values={zones}
+                searchUrl={
+                    selectedView &&
+                    `/manage_text_record/update_text_record/search?kind=zones&parent=${selectedView.id}`
+                }
                 disabled={!selectedView}
                 noMatchText='No matching zone was found'
                 placeholder='Start typing to search for a Zone'
@@ -35,8 +35,8 @@ module.exports = [
                 '../../../workspace/workflows/manage_text_record/',
             ),
             publicPath: '/manage_text_record/',
-            filename: 'js/[name].js',
-            assetModuleFilename: 'img/[name][ext]',
+            filename: 'js/[name].[contenthash].js',
+            assetModuleFilename: 'img/[name].[contenthash][ext]',
         },
         mode: process.env.NODE_ENV || 'development',
         resolve: {
@@ -0,0 +1,81 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Configuration of the unit tests of the workflows.
+
+The workflows are imported from ``workspace``. The modules of the gateway are
+only available in its image, so minimal stand-ins of the ones the shared
+modules import are used when they are missing.
+"""
+import os
+import sys
+import types
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "workspace")
+)
+
+
+class PublicError(Exception):
+    """Stand-in of the gateway's error with a message shown to the user."""
+
+    def __init__(self, message, details=None, status_code=500):
+        super().__init__(message)
+        self.details = details
+        self.status_code = status_code
+
+
+class BadRequestError(PublicError):
+    """Stand-in of the gateway's error for invalid requests."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message, details, 400)
+
+
+class FieldError:
+    """Stand-in of the gateway's details of an invalid field."""
+
+    def __init__(self, field, message):
+        self.field = field
+        self.message = message
+
+
+def _install_gateway_stand_ins():
+    errors = types.ModuleType("bluecat.gateway.errors")
+    errors.PublicError = PublicError
+    errors.BadRequestError = BadRequestError
+    errors.FieldError = FieldError
+    gateway = types.ModuleType("bluecat.gateway")
+    gateway.errors = errors
+    bluecat = types.ModuleType("bluecat")
+    bluecat.gateway = gateway
+    sys.modules.update(
+        {
+            "bluecat": bluecat,
+            "bluecat.gateway": gateway,
+            "bluecat.gateway.errors": errors,
+        }
+    )
+
+
+try:
+    import bluecat.gateway.errors  # noqa: F401 pylint: disable=unused-import
+except ImportError:
+    _install_gateway_stand_ins()
@@ -0,0 +1,97 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Tests of the size-bounded cache with per-entry expiration."""
+import pytest
+
+from workflows.common import cache
+from workflows.common.cache import TTLCache
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_stored_value():
+    entries = TTLCache()
+    entries.set("a", 1)
+    assert entries.get("a") == 1
+    assert entries.get("b", "missing") == "missing"
+
+
+def test_entry_expires_after_ttl(clock):
+    entries = TTLCache(ttl=10)
+    entries.set("a", 1)
+    clock[0] += 9.9
+    assert entries.get("a") == 1
+    clock[0] += 0.1
+    assert entries.get("a") is None
+    assert "a" not in entries.keys()
+
+
+def test_entry_ttl_overrides_default(clock):
+    entries = TTLCache(ttl=10)
+    entries.set("a", 1, ttl=60)
+    clock[0] += 30
+    assert entries.get("a") == 1
+
+
+def test_least_recently_set_entry_is_evicted():
+    entries = TTLCache(max_size=2)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.set("c", 3)
+    assert entries.keys() == ["b", "c"]
+
+
+def test_get_refreshes_recency():
+    entries = TTLCache(max_size=2)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+    assert entries.get("a") == 1
+    assert entries.get("b") is None
+    assert len(entries) == 2
+
+
+def test_get_or_load_loads_only_missing_entries():
+    entries = TTLCache()
+    calls = []
+
+    def load():
+        calls.append(None)
+        return len(calls)
+
+    assert entries.get_or_load("a", load) == 1
+    assert entries.get_or_load("a", load) == 1
+    assert len(calls) == 1
+
+
+def test_invalidate_matching_entries():
+    entries = TTLCache()
+    for key in ("a1", "a2", "b1"):
+        entries.set(key, key)
+    entries.invalidate(lambda key: key.startswith("a"))
+    assert entries.keys() == ["b1"]
+    entries.invalidate()
+    assert not entries.keys()
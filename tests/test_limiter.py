@@ -0,0 +1,142 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Tests of the adaptive limit of concurrent calls to BAM."""
+import threading
+
+import pytest
+
+from workflows.common import limiter
+from workflows.common.limiter import BULK, INTERACTIVE, AdaptiveLimiter
+
+WAIT = 5
+
+
+class Overloaded(Exception):
+    """An error of BAM answering that it is overloaded."""
+
+    status_code = 429
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(limiter.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(limiter.time, "perf_counter", lambda: now[0])
+    return now
+
+
+def _call(calls, clock, latency, lane=INTERACTIVE):
+    def func():
+        clock[0] += latency
+
+    calls.call(lane, "GET /objects", func)
+
+
+def _overload(calls):
+    def func():
+        raise Overloaded()
+
+    with pytest.raises(Overloaded):
+        calls.call(INTERACTIVE, "GET /objects", func)
+
+
+def test_limit_grows_additively_while_used(clock):
+    calls = AdaptiveLimiter(initial=2, minimum=2, maximum=10)
+    _call(calls, clock, 0.01)
+    assert calls.limit == pytest.approx(2.5)
+
+
+def test_limit_does_not_grow_beyond_maximum(clock):
+    calls = AdaptiveLimiter(initial=2, minimum=1, maximum=2)
+    for _ in range(10):
+        _call(calls, clock, 0.01)
+    assert calls.limit == 2
+
+
+def test_overload_decreases_limit_multiplicatively(clock):
+    calls = AdaptiveLimiter(initial=10, minimum=2, maximum=20)
+    _overload(calls)
+    assert calls.limit == pytest.approx(10 * limiter.BACKOFF)
+
+
+def test_limit_decreases_once_per_round_trip(clock):
+    calls = AdaptiveLimiter(initial=10, minimum=2, maximum=20)
+    _overload(calls)
+    _overload(calls)
+    assert calls.limit == pytest.approx(10 * limiter.BACKOFF)
+    clock[0] += 1
+    _overload(calls)
+    assert calls.limit == pytest.approx(10 * limiter.BACKOFF**2)
+
+
+def test_limit_does_not_fall_below_minimum(clock):
+    calls = AdaptiveLimiter(initial=3, minimum=2, maximum=20)
+    for _ in range(10):
+        clock[0] += 1
+        _overload(calls)
+    assert calls.limit == 2
+
+
+def test_sustained_slowdown_decreases_limit(clock):
+    calls = AdaptiveLimiter(initial=10, minimum=2, maximum=10)
+    for _ in range(20):
+        _call(calls, clock, 0.01)
+    assert calls.limit == 10
+    for _ in range(limiter.SLOW_CALLS - 1):
+        _call(calls, clock, 0.1)
+    assert calls.limit == 10
+    _call(calls, clock, 0.1)
+    assert calls.limit == pytest.approx(10 * limiter.BACKOFF)
+
+
+def test_single_slow_call_keeps_limit(clock):
+    calls = AdaptiveLimiter(initial=10, minimum=2, maximum=10)
+    for _ in range(20):
+        _call(calls, clock, 0.01)
+    _call(calls, clock, 0.03)
+    for _ in range(20):
+        _call(calls, clock, 0.01)
+    assert calls.limit == 10
+
+
+def test_bulk_calls_leave_room_for_interactive_calls():
+    calls = AdaptiveLimiter(initial=4, minimum=4, maximum=4)
+    release = threading.Event()
+    admitted = threading.Semaphore(0)
+
+    def func():
+        admitted.release()
+        assert release.wait(WAIT)
+
+    threads = [
+        threading.Thread(target=calls.call, args=(lane, "GET /objects", func))
+        for lane in (BULK, BULK, BULK, BULK, INTERACTIVE)
+    ]
+    for thread in threads:
+        thread.start()
+    for _ in range(4):
+        assert admitted.acquire(timeout=WAIT)
+    # Three bulk calls and the interactive call are admitted, the last bulk call
+    # waits for the reserved share of the limit.
+    assert calls.in_flight == {INTERACTIVE: 1, BULK: 3}
+    release.set()
+    for thread in threads:
+        thread.join(WAIT)
+    assert calls.in_flight == {INTERACTIVE: 0, BULK: 0}
@@ -0,0 +1,92 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Tests of paging through BAM collections."""
+import pytest
+from bluecat.gateway.errors import BadRequestError
+
+from workflows.common import paging
+
+
+class FakeClient:
+    """A BAM client serving a collection of numbered objects."""
+
+    def __init__(self, size):
+        self.objects = [{"id": number} for number in range(size)]
+        self.requests = []
+
+    def http_get(self, path, params):
+        self.requests.append((path, params))
+        offset = int(params["offset"])
+        return {"data": self.objects[offset : offset + int(params["limit"])]}
+
+
+@pytest.fixture(name="client")
+def fixture_client(monkeypatch):
+    client = FakeClient(5)
+    monkeypatch.setattr(paging.bam, "client", lambda *args: client)
+    return client
+
+
+def test_get_page_follows_cursor(client):
+    page, cursor = paging.get_page("/objects", {"fields": "id"}, "", limit=2)
+    assert [obj["id"] for obj in page] == [0, 1]
+    assert cursor == "2"
+    page, cursor = paging.get_page("/objects", {"fields": "id"}, cursor, limit=2)
+    assert [obj["id"] for obj in page] == [2, 3]
+    page, cursor = paging.get_page("/objects", {"fields": "id"}, cursor, limit=2)
+    assert [obj["id"] for obj in page] == [4]
+    assert cursor is None
+    assert client.requests[-1] == (
+        "/objects",
+        {"fields": "id", "offset": "4", "limit": "2"},
+    )
+
+
+def test_get_page_full_last_page_has_cursor(client):
+    page, cursor = paging.get_page("/objects", {}, "", limit=5)
+    assert len(page) == 5
+    page, cursor = paging.get_page("/objects", {}, cursor, limit=5)
+    assert not page
+    assert cursor is None
+
+
+def test_get_page_bounds_limit(client):
+    paging.get_page("/objects", {}, "", limit=paging.MAX_PAGE_SIZE + 1)
+    assert client.requests[-1][1]["limit"] == str(paging.MAX_PAGE_SIZE)
+    paging.get_page("/objects", {}, "", limit=0)
+    assert client.requests[-1][1]["limit"] == str(paging.DEFAULT_PAGE_SIZE)
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-1"])
+def test_get_page_rejects_invalid_cursor(client, cursor):
+    with pytest.raises(BadRequestError):
+        paging.get_page("/objects", {}, cursor)
+    assert not client.requests
+
+
+def test_iter_resources_fetches_all_pages(client):
+    objects = list(paging.iter_resources("/objects", page_size=2))
+    assert [obj["id"] for obj in objects] == [0, 1, 2, 3, 4]
+    assert [params["offset"] for _, params in client.requests] == ["0", "2", "4"]
+
+
+def test_iter_resources_starts_at_offset(client):
+    objects = list(paging.iter_resources("/objects", page_size=2, offset=3))
+    assert [obj["id"] for obj in objects] == [3, 4]
@@ -0,0 +1,129 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Tests of the reconciliation of the TXT records of a zone."""
+import threading
+
+from workflows.common.records import apply_reconcile, plan_reconcile
+
+
+def _record(record_id, name, text):
+    return {"id": record_id, "name": name, "text": text}
+
+
+def test_plan_leaves_matching_records_alone():
+    current = [_record(1, "a", "x"), _record(2, "b", "y")]
+    plan = plan_reconcile(current, [("a", "x"), ("b", "y")])
+    assert plan == {"add": [], "update": [], "delete": [], "unchanged": 2}
+
+
+def test_plan_updates_records_before_adding_and_deleting():
+    current = [_record(1, "a", "x"), _record(2, "a", "y"), _record(3, "b", "z")]
+    desired = [("a", "x"), ("a", "new"), ("c", "w")]
+    plan = plan_reconcile(current, desired)
+    assert plan["unchanged"] == 1
+    assert plan["update"] == [{"id": 2, "name": "a", "text": "new"}]
+    assert plan["add"] == [{"name": "c", "text": "w"}]
+    assert plan["delete"] == [{"id": 3, "name": "b", "text": "z"}]
+
+
+def test_plan_compares_names_without_case():
+    current = [_record(1, "WWW", "x")]
+    plan = plan_reconcile(current, [("www", "x")])
+    assert plan["unchanged"] == 1
+    assert not plan["add"] and not plan["delete"]
+
+
+def test_plan_ignores_duplicate_desired_records():
+    plan = plan_reconcile([], [("a", "x"), ("a", "x")])
+    assert plan["add"] == [{"name": "a", "text": "x"}]
+
+
+def test_plan_handles_same_as_zone_records():
+    current = [_record(1, None, "x"), _record(2, "", "y")]
+    plan = plan_reconcile(current, [("", "x")])
+    assert plan["unchanged"] == 1
+    assert plan["delete"] == [{"id": 2, "name": "", "text": "y"}]
+
+
+class FakeClient:
+    """A BAM client that records the writes made to TXT records."""
+
+    principal = "admin"
+
+    def __init__(self, fail_ids=()):
+        self.writes = []
+        self.fail_ids = fail_ids
+        self._lock = threading.Lock()
+        self._next_id = 100
+
+    def _write(self, action, record_id):
+        with self._lock:
+            self.writes.append((action, record_id))
+        if record_id in self.fail_ids:
+            raise RuntimeError(f"Failed to {action} {record_id}")
+
+    def http_delete(self, path):
+        self._write("delete", int(path.rsplit("/", 1)[1]))
+
+    def http_put(self, path, headers, json):  # pylint: disable=unused-argument
+        self._write("update", json["id"])
+
+    def http_post(self, path, params, headers, json):  # pylint: disable=unused-argument
+        with self._lock:
+            self._next_id += 1
+            record_id = self._next_id
+        self._write("add", json["name"])
+        return {"id": record_id}
+
+
+def test_apply_finishes_each_action_before_the_next():
+    plan = {
+        "add": [{"name": "c", "text": "w"}, {"name": "d", "text": "v"}],
+        "update": [{"id": 2, "name": "a", "text": "new"}],
+        "delete": [{"id": 3, "name": "b", "text": "z"}, {"id": 4, "name": "e"}],
+        "unchanged": 0,
+    }
+    client = FakeClient()
+    failed = apply_reconcile(client, 10, "example.com", plan, concurrency=4)
+    assert not failed
+    actions = [action for action, _ in client.writes]
+    assert actions == ["delete", "delete", "update", "add", "add"]
+    assert sorted(str(key) for _, key in client.writes) == ["2", "3", "4", "c", "d"]
+
+
+def test_apply_reports_failed_writes_and_continues():
+    plan = {
+        "add": [{"name": "c", "text": "w"}],
+        "update": [{"id": 2, "name": "a", "text": "new"}],
+        "delete": [{"id": 3, "name": "b", "text": "z"}],
+        "unchanged": 0,
+    }
+    client = FakeClient(fail_ids=(3,))
+    failed = apply_reconcile(client, 10, "example.com", plan, concurrency=2)
+    assert failed == [
+        {
+            "action": "delete",
+            "id": 3,
+            "name": "b",
+            "text": "z",
+            "error": "Failed to delete 3",
+        }
+    ]
+    assert [action for action, _ in client.writes] == ["delete", "update", "add"]
@@ -0,0 +1,90 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Tests of the coalescing of identical concurrent calls."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from workflows.common.singleflight import SingleFlight
+
+WAIT = 5
+
+
+def _start_callers(flight, key, func, count):
+    """Call a function for the same key from several threads."""
+    executor = ThreadPoolExecutor(max_workers=count)
+    futures = [executor.submit(flight.do, key, func) for _ in range(count)]
+    executor.shutdown(wait=False)
+    return futures
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(None)
+        started.set()
+        assert release.wait(WAIT)
+        return "result"
+
+    futures = _start_callers(flight, "key", func, 4)
+    assert started.wait(WAIT)
+    # Give the other callers time to join the call in flight.
+    time.sleep(0.2)
+    release.set()
+    assert [future.result(WAIT) for future in futures] == ["result"] * 4
+    assert len(calls) == 1
+
+
+def test_concurrent_calls_share_one_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def func():
+        started.set()
+        assert release.wait(WAIT)
+        raise ValueError("failed")
+
+    futures = _start_callers(flight, "key", func, 3)
+    assert started.wait(WAIT)
+    release.set()
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(WAIT)
+
+
+def test_calls_with_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+
+
+def test_later_call_runs_again():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(2):
+        flight.do("key", lambda: calls.append(None))
+    assert len(calls) == 2
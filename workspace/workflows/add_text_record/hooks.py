@@ -23,14 +23,23 @@
 
 def initialize():
     """Handle the `initialize` event."""
-    # NOTE: Load the modules that add routes to the blueprint instance.
-    # pylint: disable=unused-import, import-outside-toplevel
-    from . import routes
+    # pylint: disable=import-outside-toplevel
+    from ..common import startup
+
+    with startup.timed("add_text_record", "initialize"):
+        if not startup.LAZY_ROUTES:
+            # NOTE: Load the modules that add routes to the blueprint instance.
+            # pylint: disable=unused-import
+            from . import routes  # noqa: F401
 
 
 def attach(application):
     """Attach handlers (and/or configure) the web application."""
     # pylint: disable=import-outside-toplevel
+    from ..common import compression, metrics, startup
     from .base import bp
 
-    application.register_blueprint(bp)
+    with startup.timed("add_text_record", "attach"):
+        startup.register(application, bp, f"{__package__}.routes")
+        metrics.install(application)
+        compression.install(application)
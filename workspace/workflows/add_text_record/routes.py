@@ -20,7 +20,7 @@
 """Routes and back-end implementation of workflow ``add_text_record``."""
 import os
 
-from flask import g, request, send_from_directory
+from flask import request
 
 # pylint: disable=import-error
 from bluecat.gateway.decorators import (
@@ -34,8 +34,24 @@ from bluecat.gateway.errors import (
 )  # pylint: disable=import-error
 from bluecat.util import no_cache  # pylint: disable=import-error
 
+from ..common import bam, bulk, hierarchy, jobs, limiter, paging, search, static
+from ..common.etag import conditional
+from ..common.records import (
+    build_text_record,
+    check_not_duplicate,
+    get_index,
+    index_records,
+    iter_txt_records,
+    record_saved,
+    reserved,
+    validate_row,
+)
 from .base import bp
 
+WORKFLOW_DIR = os.path.dirname(os.path.abspath(str(__file__)))
+
+static.register_assets(bp, WORKFLOW_DIR)
+
 
 def validate_form(zone_id, zone_name):
     """
@@ -57,6 +73,34 @@ def validate_form(zone_id, zone_name):
         )
 
 
+def add_text_record(bam_client, zone_id, headers, body):
+    """
+    Add a text record to a zone.
+
+    :param bam_client: The BAM client of the user.
+    :param zone_id: The ID of the zone.
+    :param headers: The request headers, as built by :func:`build_text_record`.
+    :param body: The request body, as built by :func:`build_text_record`.
+    :return: The result in a JSON-serializable form.
+    """
+    text_record = bam_client.http_post(
+        f"/zones/{zone_id}/resourceRecords",
+        params={"fields": "id,absoluteName", "orderBy": "desc(name)", "limit": "9999"},
+        headers=headers,
+        json=body,
+    )
+    record_saved(
+        zone_id,
+        {"id": text_record["id"], "name": body["name"], "text": body["text"]},
+        bam_client.principal,
+    )
+
+    return {
+        "message": f"Successfully added Text Record {text_record['absoluteName']}. "
+        f"Added with Object ID: {text_record['id']} successfully."
+    }
+
+
 @bp.route("/")
 @page_exc_handler(default_message='Failed to load page "Add text record".')
 @require_permission("add_text_record")
@@ -66,62 +110,67 @@ def page():
 
     :return: Response with page HTML.
     """
-    return send_from_directory(
-        os.path.dirname(os.path.abspath(str(__file__))), "html/addTextRecord/index.html"
-    )
+    hierarchy.warm()
+    return static.send_page(WORKFLOW_DIR, "html/addTextRecord/index.html")
 
 
 @bp.route("/configurations")
 @api_exc_handler(default_message="Failed to get configurations available on BAM.")
 @require_permission("add_text_record")
+@conditional
 def api_get_configurations():
     """
     Get configurations for the dropDown in the Add Text Record page
     """
-    rdata = g.user.bam_api.v2.http_get(
-        "/configurations",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    configurations = rdata["data"]
-    return {"configurations": configurations}
+    return {"configurations": hierarchy.get_configurations()}
 
 
-@bp.route("/views", methods=["POST"])
+@bp.route("/views", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get views available on BAM.")
 @require_permission("add_text_record")
+@conditional
 def api_get_views():
     """
     Get views under the selected configuration in the Add Text Record page
     """
-    configuration_id = request.form["configuration"]
-
-    rdata = g.user.bam_api.v2.http_get(
-        f"/configurations/{configuration_id}/views",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    views = rdata["data"]
-    return {"views": views}
+    configuration_id = request.values["configuration"]
+    hierarchy.remember_configuration(configuration_id)
+    return {"views": hierarchy.get_views(configuration_id)}
 
 
-@bp.route("/zones", methods=["POST"])
+@bp.route("/zones", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get zones available on BAM.")
 @require_permission("add_text_record")
+@conditional
 def api_get_zones():
     """
     Get zones under the selected view in the Add Text Record page
     """
-    view_id = request.form["view"]
-    rdata = g.user.bam_api.v2.http_get(
-        f"/views/{view_id}/zones",
-        params={
-            "fields": "id,name",
-            "orderBy": "desc(name)",
-            "limit": "9999",
-            "filter": "type:eq('Zone')",
-        },
-    )
-    zones = rdata["data"]
-    return {"zones": zones}
+    view_id = request.values["view"]
+    return {"zones": hierarchy.get_zones(view_id)}
+
+
+@bp.route("/hierarchy")
+@api_exc_handler(default_message="Failed to get the hierarchy of zones on BAM.")
+@require_permission("add_text_record")
+@conditional
+def api_get_hierarchy():
+    """
+    Get configurations, views and zones for the Add Text Record page in a single
+    request
+    """
+    return hierarchy.tree_request()
+
+
+@bp.route("/search")
+@api_exc_handler(default_message="Failed to search objects available on BAM.")
+@require_permission("add_text_record")
+def api_search():
+    """
+    Search configurations, views or zones by name for the typeahead fields in the
+    Add Text Record page
+    """
+    return search.search_request(search.HIERARCHY_LOADERS)
 
 
 @bp.route("/", methods=["POST"])
@@ -132,6 +181,8 @@ def api_post_add_text_record():
     """
     Add a text record based on the provided parameters.
     The inputs are validated and an error response may be returned.
+    If ``async`` is set, the record is added in the background and the ID of the
+    job is returned.
     """
 
     # Validate form data
@@ -140,30 +191,85 @@ def api_post_add_text_record():
         request.form["zone_name"],
     )
 
-    headers = {}
-    if request.form["name"]:
-        absolute_name = request.form["name"] + "." + request.form["zone_name"]
-    else:
-        absolute_name = None
-        headers = {"x-bcn-same-as-zone": "true"}
-
     zone_id = request.form["zone_id"]
-    body = {
-        "type": "TXTRecord",
-        "name": request.form["name"] if request.form["name"] else None,
-        "text": request.form["text"] if request.form["text"] else None,
-        "absoluteName": absolute_name,
-    }
+    headers, body = build_text_record(
+        request.form["name"], request.form["text"], request.form["zone_name"]
+    )
+    check_not_duplicate(get_index(zone_id), body["name"], body["text"])
 
-    # Attempt to add the text record
-    text_record = g.user.bam_api.v2.http_post(
-        f"/zones/{zone_id}/resourceRecords",
-        params={"fields": "id,absoluteName", "orderBy": "desc(name)", "limit": "9999"},
-        headers=headers,
-        json=body,
+    return jobs.run(
+        "add_text_record", add_text_record, bam.client(), zone_id, headers, body
     )
 
-    return {
-        "message": f"Successfully added Text Record {text_record['absoluteName']}. "
-        f"Added with Object ID: {text_record['id']} successfully."
-    }
+
+@bp.route("/jobs/<job_id>")
+@no_cache
+@api_exc_handler(default_message="Failed to get the status of the operation.")
+@require_permission("add_text_record")
+def get_job(job_id):
+    """
+    Get the status of an operation requested with ``async`` set.
+    """
+    return jobs.status(job_id)
+
+
+@bp.route("/bulk", methods=["POST"])
+@no_cache
+@api_exc_handler(default_message="Failed to import text records.")
+@require_permission("add_text_record")
+@bam.use_lane(limiter.BULK)
+def api_post_bulk_add_text_records():
+    """
+    Add text records to a zone from an uploaded CSV or JSONL file, whose rows have
+    a ``name`` and a ``text``. The records are added concurrently and a result per
+    row is streamed back as newline-delimited JSON.
+    """
+    zone_id = request.form["zone_id"]
+    zone_name = request.form["zone_name"]
+    validate_form(zone_id, zone_name)
+
+    upload = request.files.get("file")
+    if not upload:
+        raise BadRequestError(
+            "File is not specified",
+            details=FieldError("file", "Please select a file."),
+        )
+    fmt = bulk.get_upload_format(upload, request.form.get("format"))
+    concurrency = bulk.get_concurrency(request.form.get("concurrency", type=int))
+    bam_client = bam.client()
+    # Listing the zone once is cheaper than failed writes of duplicates.
+    index = get_index(zone_id) or index_records(zone_id, iter_txt_records(zone_id))
+
+    def add(numbered_row):
+        row = numbered_row[1]
+        if isinstance(row, Exception):
+            raise row
+        validate_row(row)
+        headers, body = build_text_record(row.get("name"), row["text"], zone_name)
+        # The same record may be repeated in the file and added concurrently.
+        with reserved(index, body["name"], body["text"]):
+            text_record = bam_client.http_post(
+                f"/zones/{zone_id}/resourceRecords",
+                params={"fields": "id,absoluteName"},
+                headers=headers,
+                json=body,
+            )
+            item = {"id": text_record["id"], "name": body["name"], "text": body["text"]}
+            record_saved(zone_id, item, bam_client.principal)
+            # The index may no longer be the one kept for the user.
+            index.add(item)
+        return text_record
+
+    def report():
+        rows = bulk.iter_rows(upload, fmt)
+        for (number, _), text_record, error in bulk.run_bounded(add, rows, concurrency):
+            if error:
+                yield {"row": number, "error": str(error)}
+            else:
+                yield {
+                    "row": number,
+                    "id": text_record["id"],
+                    "absoluteName": text_record["absoluteName"],
+                }
+
+    return paging.ndjson_response(report())
@@ -0,0 +1,165 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Access to BAM REST v2 API on behalf of the user of the current request."""
+import functools
+
+from flask import g
+
+from . import pool
+from .limiter import INTERACTIVE, LIMITER
+from .metrics import template_path, timed_bam_call
+from .singleflight import SingleFlight
+
+_flights = SingleFlight()
+
+
+def current_principal():
+    """
+    Get the name of the BAM user of the current request.
+
+    :return: The name of the BAM user.
+    """
+    return g.user.get_username()
+
+
+def _freeze(params):
+    if not params:
+        return ()
+    return tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+class BAMClient:
+    """
+    A wrapper of the BAM REST v2 API client of a user.
+
+    Identical GET requests of the same user that run concurrently share a single
+    call to BAM and its result, so the returned data must not be modified.
+
+    The latency of every call is recorded in the workflow metrics, and the
+    number of concurrent calls is bounded by the adaptive limit shared by all
+    users.
+
+    Unlike ``flask.g``, the wrapper can be passed to and used by worker threads.
+
+    :param api: The BAM REST v2 API client of the user.
+    :param principal: The name of the BAM user.
+    :param lane: The priority of the calls, one of :data:`.limiter.LANES`.
+    """
+
+    def __init__(self, api, principal, lane=INTERACTIVE):
+        self.api = api
+        self.principal = principal
+        self.lane = lane
+
+    def _call(self, method, path, func):
+        return LIMITER.call(
+            self.lane,
+            (method, template_path(path)),
+            lambda: timed_bam_call(method, path, func),
+        )
+
+    def http_get(self, path, params=None, **kwargs):
+        """
+        Perform a GET request, joining an identical request already in flight.
+
+        :param path: The path of the resource.
+        :param params: The query parameters of the request.
+        :return: The data of the response.
+        """
+        if kwargs:
+            return self._call(
+                "GET", path, lambda: self.api.http_get(path, params=params, **kwargs)
+            )
+        key = (self.principal, path, _freeze(params))
+        return _flights.do(
+            key,
+            lambda: self._call(
+                "GET", path, lambda: self.api.http_get(path, params=params)
+            ),
+        )
+
+    def http_post(self, path, **kwargs):
+        """
+        Perform a POST request.
+
+        :param path: The path of the resource.
+        :return: The data of the response.
+        """
+        return self._call("POST", path, lambda: self.api.http_post(path, **kwargs))
+
+    def http_put(self, path, **kwargs):
+        """
+        Perform a PUT request.
+
+        :param path: The path of the resource.
+        :return: The data of the response.
+        """
+        return self._call("PUT", path, lambda: self.api.http_put(path, **kwargs))
+
+    def http_patch(self, path, **kwargs):
+        """
+        Perform a PATCH request.
+
+        :param path: The path of the resource.
+        :return: The data of the response.
+        """
+        return self._call("PATCH", path, lambda: self.api.http_patch(path, **kwargs))
+
+    def http_delete(self, path, **kwargs):
+        """
+        Perform a DELETE request.
+
+        :param path: The path of the resource.
+        :return: The data of the response.
+        """
+        return self._call("DELETE", path, lambda: self.api.http_delete(path, **kwargs))
+
+
+def use_lane(name):
+    """
+    Decorator for routes that sets the priority of the calls to BAM they make
+    through :func:`client`. Routes of bulk operations should use the bulk lane, so
+    they do not slow down interactive use.
+
+    :param name: The lane of the calls, one of :data:`.limiter.LANES`.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            g.bam_lane = name
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def client(lane=None):
+    """
+    Get the BAM REST v2 API client of the user of the current request.
+
+    :param lane: The priority of the calls, one of :data:`.limiter.LANES`.
+        Defaults to the lane of the route, or the interactive lane.
+    :return: The wrapped client.
+    """
+    api = g.user.bam_api.v2
+    pool.install(api)
+    return BAMClient(api, current_principal(), lane or g.get("bam_lane", INTERACTIVE))
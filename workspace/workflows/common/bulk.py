@@ -0,0 +1,164 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Helpers for bulk operations: streamed uploads and bounded concurrency."""
+import codecs
+import csv
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+#: The number of concurrent BAM requests used when the caller does not specify it.
+DEFAULT_CONCURRENCY = 4
+
+#: The maximum number of concurrent BAM requests a caller can ask for.
+MAX_CONCURRENCY = 16
+
+#: The supported formats of uploaded files.
+UPLOAD_FORMATS = ("csv", "jsonl")
+
+
+def get_concurrency(value):
+    """
+    Get the number of concurrent requests to use for a bulk operation.
+
+    :param value: The number requested by the caller, if any.
+    :return: The requested number, limited to the allowed range.
+    """
+    if not value:
+        return DEFAULT_CONCURRENCY
+    return max(1, min(value, MAX_CONCURRENCY))
+
+
+def run_bounded(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Call a function for each item using a pool of worker threads. Items are
+    consumed lazily, so only a bounded number of them is held in memory.
+
+    The function runs outside of the request context, so it must not rely on
+    ``flask.g`` or ``flask.request``.
+
+    :param func: The function to call with each item.
+    :param items: An iterable of items.
+    :param concurrency: The maximum number of concurrent calls.
+    :return: A generator of tuples of an item, the result of the call, and the
+        exception it raised or ``None``, in the order of the items.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= concurrency * 2:
+                yield _outcome(*pending.popleft())
+        while pending:
+            yield _outcome(*pending.popleft())
+
+
+def _outcome(item, future):
+    error = future.exception()
+    return item, None if error else future.result(), error
+
+
+def get_upload_format(upload, requested=None):
+    """
+    Determine the format of an uploaded file.
+
+    :param upload: The uploaded file.
+    :param requested: The format explicitly requested by the caller, if any.
+    :return: One of :data:`UPLOAD_FORMATS`.
+    """
+    fmt = requested or (upload.filename or "").rsplit(".", 1)[-1].lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in UPLOAD_FORMATS:
+        raise BadRequestError(
+            "Unsupported file format",
+            details=FieldError("file", "Please upload a CSV or JSONL file."),
+        )
+    return fmt
+
+
+class _Errors(list):
+    """The lines of a file that could not be decoded, and the last line read."""
+
+    line = 0
+
+
+def _decode_lines(stream, errors):
+    """
+    Decode the lines of a UTF-8 file one at a time. A line that cannot be decoded
+    is replaced by an empty one, and its number and the error are added to
+    ``errors``. The number of the last line read is kept in the ``line`` attribute
+    of ``errors``.
+    """
+    for number, line in enumerate(stream, start=1):
+        errors.line = number
+        if number == 1 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8) :]
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError as e:
+            errors.append((number, ValueError(f"The line is not valid UTF-8: {e}")))
+            yield "\n"
+
+
+def iter_rows(upload, fmt):
+    """
+    Parse an uploaded file as a stream of rows.
+
+    :param upload: The uploaded file.
+    :param fmt: The format of the file, one of :data:`UPLOAD_FORMATS`.
+    :return: A generator of tuples of a row number and either the row as a
+        dictionary or the exception raised while decoding or parsing it.
+    """
+    errors = _Errors()
+    lines = _decode_lines(upload.stream, errors)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row = next(reader)
+                number = reader.line_num
+            except StopIteration:
+                row = None
+            except csv.Error as e:
+                row, number = e, errors.line
+            # Lines that could not be decoded precede the row read after them.
+            yield from errors
+            errors.clear()
+            if row is None:
+                return
+            yield number, row
+    for number, line in enumerate(lines, start=1):
+        if errors:
+            yield errors.pop()
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, e
+            continue
+        if not isinstance(row, dict):
+            row = ValueError("Each line must contain a JSON object.")
+        yield number, row
@@ -0,0 +1,117 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Thread-safe, size-bounded cache with per-entry expiration."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A least-recently-used cache whose entries expire after a time-to-live.
+
+    :param max_size: The maximum number of entries kept; the least recently used
+        entry is evicted once the limit is reached.
+    :param ttl: The default number of seconds an entry stays valid.
+    """
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get the value stored under a key.
+
+        :param key: The key of the entry.
+        :param default: The value to return if the entry is missing or expired.
+        :return: The stored value or the default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value under a key.
+
+        :param key: The key of the entry.
+        :param value: The value to store.
+        :param ttl: The number of seconds the entry stays valid. The cache's
+            default is used if not specified.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Get the value stored under a key, loading and storing it if missing.
+
+        :param key: The key of the entry.
+        :param loader: A callable without arguments that produces the value.
+        :param ttl: The number of seconds a newly loaded entry stays valid.
+        :return: The stored or the newly loaded value.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, predicate=None):
+        """
+        Remove entries from the cache.
+
+        :param predicate: A callable that receives a key and returns whether its
+            entry should be removed. All entries are removed if not specified.
+        """
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def keys(self):
+        """
+        Get the keys of the entries currently in the cache.
+
+        :return: A list of keys, possibly including ones of expired entries.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
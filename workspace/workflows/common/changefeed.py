@@ -0,0 +1,407 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Feeds of the changes to the records of a zone, streamed to the browser as
+Server-Sent Events, so that pages can patch their lists in place instead of
+listing the whole zone again.
+
+A feed is kept per BAM user and zone. It receives the writes the user makes
+through the gateway as they happen. When :data:`POLL_INTERVAL` is set, it also
+receives the changes made elsewhere from listings of the zone repeated while a
+page is subscribed to it.
+
+Every stream holds a gateway thread while it is open, so the number of open
+streams is limited per process and per user.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from flask import Response, stream_with_context
+
+from .cache import TTLCache
+from .serialization import dumps
+
+#: The number of seconds between listings of a zone whose changes are streamed.
+#: Zones are not listed while streaming if zero, the default.
+POLL_INTERVAL = float(os.environ.get("WORKFLOW_CHANGE_POLL_INTERVAL", "0"))
+
+#: The maximum number of streams open at once in a gateway process.
+MAX_STREAMS = int(os.environ.get("WORKFLOW_CHANGE_MAX_STREAMS", "16"))
+
+#: The maximum number of streams a user can have open at once in a gateway
+#: process.
+MAX_USER_STREAMS = int(os.environ.get("WORKFLOW_CHANGE_MAX_USER_STREAMS", "2"))
+
+#: The number of seconds after which an idle stream sends a comment, so that
+#: proxies do not close it.
+KEEPALIVE_INTERVAL = 15.0
+
+#: The number of seconds a stream stays open. The browser then reconnects and
+#: resumes from the last event it received, which frees the gateway thread
+#: serving it in the meantime.
+STREAM_DURATION = 300.0
+
+#: The number of milliseconds the browser waits before reconnecting.
+RETRY_DELAY = 5000
+
+#: The number of seconds a browser is asked to wait before opening a stream
+#: again when too many are open.
+BUSY_RETRY_AFTER = 60
+
+#: The number of recent events of a feed that a reconnecting browser can resume
+#: from.
+FEED_EVENTS = 1000
+
+#: The number of seconds a feed without streams is kept.
+FEED_TTL = 600.0
+
+#: The maximum number of feeds kept.
+FEED_SIZE = 1024
+
+ADDED = "add"
+CHANGED = "change"
+REMOVED = "remove"
+RESET = "reset"
+READY = "ready"
+
+_logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """
+    The recent changes to the records of a zone, and the state of the records they
+    were derived from.
+
+    The state maps the ID of every record to an opaque fingerprint of its
+    content, so that a listing of the zone can be compared with it.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=FEED_EVENTS)
+        self._sequence = 0
+        self._state = None
+        self._condition = threading.Condition()
+        self._next_poll = 0.0
+        self._polling = False
+
+    def _append(self, kind, data):
+        self._sequence += 1
+        self._events.append((self._sequence, kind, data))
+
+    def seed(self, state):
+        """
+        Set the state of the records if it is not known yet.
+
+        :param state: A dictionary of the fingerprints of the records by ID.
+        """
+        with self._condition:
+            if self._state is None:
+                self._state = {str(key): value for key, value in state.items()}
+
+    def saved(self, record, fingerprint, known_only=False):
+        """
+        Record that a record was added or updated.
+
+        :param record: The new state of the record, with an ``id``.
+        :param fingerprint: The fingerprint of the new state.
+        :param known_only: Whether to ignore records that are not in the feed's
+            state, when the zone of the record is not known.
+        """
+        record_id = str(record["id"])
+        with self._condition:
+            state = self._state
+            if state is None or (known_only and record_id not in state):
+                return
+            if state.get(record_id) == fingerprint:
+                return
+            kind = CHANGED if record_id in state else ADDED
+            state[record_id] = fingerprint
+            self._append(kind, record)
+            self._condition.notify_all()
+
+    def deleted(self, record_id):
+        """
+        Record that a record was deleted.
+
+        :param record_id: The ID of the record.
+        """
+        record_id = str(record_id)
+        with self._condition:
+            if self._state is None or record_id not in self._state:
+                return
+            del self._state[record_id]
+            self._append(REMOVED, {"id": record_id})
+            self._condition.notify_all()
+
+    def replace(self, records, fingerprint):
+        """
+        Record the differences between a listing of the zone and the feed's state.
+        The first listing only sets the state.
+
+        :param records: All records of the zone, each with an ``id``.
+        :param fingerprint: A callable that returns the fingerprint of a record.
+        """
+        current = {str(record["id"]): record for record in records}
+        with self._condition:
+            previous = self._state
+            self._state = {key: fingerprint(value) for key, value in current.items()}
+            if previous is None:
+                return
+            for key, record in current.items():
+                if key not in previous:
+                    self._append(ADDED, record)
+                elif previous[key] != self._state[key]:
+                    self._append(CHANGED, record)
+            for key in previous:
+                if key not in current:
+                    self._append(REMOVED, {"id": key})
+            self._condition.notify_all()
+
+    def __contains__(self, record_id):
+        with self._condition:
+            return self._state is not None and str(record_id) in self._state
+
+    def claim_poll(self):
+        """
+        Check whether the zone is due to be listed, and if so, let the caller list
+        it while other streams of the feed wait for the result.
+
+        :return: Whether the caller should list the zone.
+        """
+        if POLL_INTERVAL <= 0:
+            return False
+        with self._condition:
+            if self._polling or time.monotonic() < self._next_poll:
+                return False
+            self._polling = True
+            return True
+
+    def release_poll(self):
+        """Schedule the next listing of the zone after the current one."""
+        with self._condition:
+            self._polling = False
+            self._next_poll = time.monotonic() + POLL_INTERVAL
+
+    def event_id(self, sequence):
+        """
+        Get the ID of an event as sent to the browser.
+
+        :param sequence: The sequence number of the event.
+        :return: The ID.
+        """
+        return f"{self.epoch}-{sequence}"
+
+    def resolve(self, event_id):
+        """
+        Get the sequence number of the event the browser last received.
+
+        :param event_id: The ID of the event, or ``None`` for a new stream.
+        :return: The sequence number, or ``None`` if the events after it are no
+            longer kept.
+        """
+        with self._condition:
+            if not event_id:
+                return self._sequence
+            epoch, _, sequence = event_id.partition("-")
+            if epoch != self.epoch or not sequence.isdigit():
+                return None
+            sequence = int(sequence)
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+            if sequence > self._sequence or sequence < oldest - 1:
+                return None
+            return sequence
+
+    def wait(self, sequence, timeout):
+        """
+        Wait for events after a sequence number.
+
+        :param sequence: The sequence number of the last event received.
+        :param timeout: The maximum number of seconds to wait.
+        :return: A tuple of the new events, each a tuple of the sequence number,
+            kind and data, and the sequence number of the last one. The events are
+            ``None`` if the ones after the sequence number are no longer kept.
+        """
+        with self._condition:
+            if self._sequence == sequence:
+                self._condition.wait(timeout)
+            if self._sequence == sequence:
+                return [], sequence
+            if not self._events or self._events[0][0] > sequence + 1:
+                return None, self._sequence
+            events = [event for event in self._events if event[0] > sequence]
+            return events, self._sequence
+
+    def until_poll(self):
+        """
+        Get the number of seconds until the zone is due to be listed.
+
+        :return: The number of seconds, at least one, or infinity if zones are not
+            listed.
+        """
+        if POLL_INTERVAL <= 0:
+            return float("inf")
+        with self._condition:
+            return max(1.0, self._next_poll - time.monotonic())
+
+
+_feeds = TTLCache(max_size=FEED_SIZE, ttl=FEED_TTL)
+_feeds_lock = threading.Lock()
+_streams = Counter()
+_streams_lock = threading.Lock()
+
+
+def get_feed(principal, zone_id):
+    """
+    Get the feed of the changes to the records of a zone seen by a user, creating
+    it if needed.
+
+    :param principal: The name of the BAM user.
+    :param zone_id: The ID of the zone.
+    :return: The feed.
+    """
+    key = (principal, str(zone_id))
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = ChangeFeed()
+        # Every use extends the lifetime of the feed.
+        _feeds.set(key, feed)
+        return feed
+
+
+def iter_feeds(zone_id=None, principal=None):
+    """
+    Iterate over feeds.
+
+    :param zone_id: The ID of the zone whose feeds to return. The feeds of all
+        zones are returned if not specified.
+    :param principal: The name of the BAM user whose feeds to return. The feeds
+        of all users are returned if not specified.
+    :return: A generator of feeds.
+    """
+    for key in _feeds.keys():
+        if zone_id is not None and key[1] != str(zone_id):
+            continue
+        if principal is not None and key[0] != principal:
+            continue
+        feed = _feeds.get(key)
+        if feed is not None:
+            yield feed
+
+
+def _open_stream(principal):
+    with _streams_lock:
+        if (
+            sum(_streams.values()) >= MAX_STREAMS
+            or _streams[principal] >= MAX_USER_STREAMS
+        ):
+            return False
+        _streams[principal] += 1
+        return True
+
+
+def _close_stream(principal):
+    with _streams_lock:
+        _streams[principal] -= 1
+        if _streams[principal] <= 0:
+            del _streams[principal]
+
+
+def _format(event_id, kind, data):
+    return (
+        f"id: {event_id}\nevent: {kind}\ndata: ".encode("utf-8") + dumps(data) + b"\n\n"
+    )
+
+
+def stream(principal, zone_id, last_event_id, poll):
+    """
+    Create a response that streams the changes to the records of a zone as
+    Server-Sent Events. Each event has the kind of the change as its type, and
+    the record, or only the ID of a removed record, as its JSON data.
+
+    A ``ready`` event is sent first, and a ``reset`` event when the events since
+    the one the browser last received are no longer kept, after which the list
+    of records should be loaded again.
+
+    The response has status 503 and a ``Retry-After`` header instead when the
+    process or the user already has as many streams open as allowed.
+
+    :param principal: The name of the BAM user.
+    :param zone_id: The ID of the zone.
+    :param last_event_id: The ID of the last event the browser received, when it
+        reconnects.
+    :param poll: A callable that receives the feed, lists the zone and passes the
+        listing to :meth:`ChangeFeed.replace`. It is called by at most one stream
+        of a feed at a time, once per :data:`POLL_INTERVAL`.
+    :return: The streamed response.
+    """
+    if not _open_stream(principal):
+        response = Response(status=503)
+        response.headers["Retry-After"] = str(BUSY_RETRY_AFTER)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    feed = get_feed(principal, zone_id)
+
+    def events():
+        deadline = time.monotonic() + STREAM_DURATION
+        sequence = feed.resolve(last_event_id)
+        yield f"retry: {RETRY_DELAY}\n\n".encode("utf-8")
+        if sequence is None:
+            sequence = feed.resolve(None)
+            yield _format(feed.event_id(sequence), RESET, {})
+        elif not last_event_id:
+            yield _format(feed.event_id(sequence), READY, {})
+        while time.monotonic() < deadline:
+            get_feed(principal, zone_id)
+            if feed.claim_poll():
+                try:
+                    poll(feed)
+                except Exception:  # pylint: disable=broad-except
+                    _logger.exception("Failed to list the records of zone %s", zone_id)
+                finally:
+                    feed.release_poll()
+            timeout = min(
+                KEEPALIVE_INTERVAL,
+                feed.until_poll(),
+                max(0.0, deadline - time.monotonic()),
+            )
+            new_events, last = feed.wait(sequence, timeout)
+            if new_events is None:
+                yield _format(feed.event_id(last), RESET, {})
+            elif new_events:
+                for number, kind, data in new_events:
+                    yield _format(feed.event_id(number), kind, data)
+            else:
+                yield b": keep-alive\n\n"
+            sequence = last
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    # The slot is given back when the server closes the response, whether or not
+    # the stream was started.
+    response.call_on_close(lambda: _close_stream(principal))
+    response.headers["Cache-Control"] = "no-cache"
+    # Keep reverse proxies from holding the events back.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,62 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Change detection between versions of BAM REST v2 API objects."""
+from .serialization import HAL_KEYS
+
+#: The keys that identify an object and are never part of a change.
+IDENTITY_KEYS = ("id", "type")
+
+#: The content type of a JSON merge patch (RFC 7396).
+MERGE_PATCH = "application/merge-patch+json"
+
+
+def changed_fields(base, submitted, ignore=IDENTITY_KEYS):
+    """
+    Get the fields of an object that differ from a previous version.
+
+    :param base: The previous version of the object.
+    :param submitted: The new version of the object.
+    :param ignore: The fields that are not compared.
+    :return: The changed fields and their new values, as a merge patch.
+    """
+    skipped = set(ignore) | set(HAL_KEYS)
+    return {
+        key: value
+        for key, value in submitted.items()
+        if key not in skipped and (key not in base or base[key] != value)
+    }
+
+
+def conflicting_fields(original, current, ignore=IDENTITY_KEYS):
+    """
+    Get the fields of an object that were changed on the server since a client
+    loaded it.
+
+    :param original: The version of the object loaded by the client.
+    :param current: The version of the object on the server.
+    :param ignore: The fields that are not compared.
+    :return: The names of the fields whose values differ.
+    """
+    skipped = set(ignore) | set(HAL_KEYS)
+    return [
+        key
+        for key, value in original.items()
+        if key not in skipped and current.get(key) != value
+    ]
@@ -0,0 +1,163 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Compression of the responses of the workflow routes, negotiated from the
+``Accept-Encoding`` of the request.
+
+zstd is offered if the optional ``zstandard`` package is installed, gzip
+otherwise. Responses are compressed while they are sent, so streamed responses
+stay streamed and a large body is not held in memory a second time.
+"""
+import time
+import zlib
+
+from flask import request
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+#: The smallest body, in bytes, that is compressed. Streamed responses are always
+#: compressed, since their size is not known in advance.
+MIN_SIZE = 1024
+
+#: The types of content that are compressed.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+)
+
+#: The compression level of gzip.
+GZIP_LEVEL = 6
+
+#: The compression level of zstd.
+ZSTD_LEVEL = 3
+
+#: The size of the slices a body is compressed in.
+CHUNK_SIZE = 64 * 1024
+
+#: The number of seconds after which the data compressed so far is sent, so
+#: that slowly streamed responses reach the client progressively.
+FLUSH_INTERVAL = 0.5
+
+
+def _encodings():
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def _compressor(encoding):
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def compress_chunks(chunks, encoding, charset="utf-8"):
+    """
+    Compress a body while it is being sent.
+
+    :param chunks: An iterable of the chunks of the body, as bytes or text.
+    :param encoding: The content coding, ``gzip`` or ``zstd``.
+    :param charset: The character set of chunks given as text.
+    :return: A generator of the compressed chunks.
+    """
+    compress, flush, finish = _compressor(encoding)
+    flushed = time.monotonic()
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compress(chunk)
+            now = time.monotonic()
+            if now - flushed >= FLUSH_INTERVAL:
+                data += flush()
+                flushed = now
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _slices(body):
+    view = memoryview(body)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start : start + CHUNK_SIZE]
+
+
+def _is_compressible(response):
+    if request.method == "HEAD" or response.direct_passthrough:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if "Content-Encoding" in response.headers or response.cache_control.no_transform:
+        return False
+    return response.mimetype in COMPRESSIBLE_TYPES
+
+
+def _compress_response(response):
+    if not _is_compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        source = response.response
+    else:
+        body = response.get_data()
+        if len(body) < MIN_SIZE:
+            return response
+        source = _slices(body)
+    response.response = compress_chunks(source, encoding)
+    response.headers["Content-Encoding"] = encoding
+    response.headers.pop("Content-Length", None)
+    # The tag describes the uncompressed content, so it only matches weakly.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def install(application):
+    """
+    Install the compression of responses in the web application. Installing it
+    more than once has no effect.
+
+    :param application: The web application.
+    """
+    if "workflow_compression" in application.extensions:
+        return
+    application.extensions["workflow_compression"] = True
+    application.after_request(_compress_response)
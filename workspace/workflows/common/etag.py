@@ -0,0 +1,66 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Entity tags and conditional responses for JSON listings."""
+import functools
+import hashlib
+
+from flask import current_app, request
+
+from .serialization import dumps
+
+
+def conditional_response(payload):
+    """
+    Create a JSON response tagged with a hash of its content. If the request's
+    ``If-None-Match`` header already has the tag, weak or not, an empty
+    ``304 Not Modified`` response is created instead.
+
+    The tag is weak, since it describes the JSON content whether or not the body
+    is compressed, and a ``304`` response has the same tag as the full one.
+
+    :param payload: The JSON-serializable data of the response.
+    :return: The response.
+    """
+    body = dumps(payload)
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(func):
+    """
+    Decorate a view that returns JSON-serializable data, so that it responds with
+    an entity tag and answers conditional requests.
+
+    :param func: The view function.
+    :return: The decorated view function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return conditional_response(func(*args, **kwargs))
+
+    return wrapper
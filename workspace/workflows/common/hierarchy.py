@@ -0,0 +1,251 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Cached lookups of the configuration, view and zone hierarchy in BAM.
+
+The entries are kept per BAM user, so a user is only ever served data that was
+retrieved with their own permissions.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request, session
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+from .bam import client
+from .bulk import run_bounded
+from .cache import TTLCache
+from .limiter import BULK
+
+#: The number of seconds a cached listing stays valid.
+HIERARCHY_CACHE_TTL = 60.0
+
+#: The maximum number of listings kept in the cache.
+HIERARCHY_CACHE_SIZE = 1024
+
+LIST_PARAMS = {"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"}
+ZONE_LIST_PARAMS = {**LIST_PARAMS, "filter": "type:eq('Zone')"}
+
+#: The levels of the hierarchy, from the top.
+LEVELS = ("configurations", "views", "zones")
+
+#: The number of listings fetched concurrently when expanding the hierarchy.
+TREE_CONCURRENCY = 8
+
+#: The number of users whose listings can be preloaded at the same time.
+WARM_WORKERS = 2
+
+#: The maximum number of preloads waiting for or being run by the workers. Pages
+#: opened while as many are pending are not preloaded.
+WARM_PENDING = 32
+
+#: The session entry with the ID of the configuration whose views the user last
+#: listed.
+LAST_CONFIGURATION_KEY = "workflows.last_configuration"
+
+_cache = TTLCache(max_size=HIERARCHY_CACHE_SIZE, ttl=HIERARCHY_CACHE_TTL)
+_warmer = ThreadPoolExecutor(max_workers=WARM_WORKERS, thread_name_prefix="warm")
+_warm_pending = set()
+_warm_lock = threading.Lock()
+
+
+def cached_get(path, params=None, ttl=None, bam_client=None):
+    """
+    Perform a GET request to BAM REST v2 API, reusing a cached response if the
+    same user has recently made the same request.
+
+    :param path: The path of the resource.
+    :param params: The query parameters of the request.
+    :param ttl: The number of seconds a newly retrieved response stays valid.
+    :param bam_client: The client to use. The one of the current request is used
+        if not specified.
+    :return: The data of the response.
+    """
+    params = params or {}
+    bam_client = bam_client or client()
+    key = (bam_client.principal, path, tuple(sorted(params.items())))
+    return _cache.get_or_load(
+        key, lambda: bam_client.http_get(path, params=params), ttl
+    )
+
+
+def get_configurations(bam_client=None):
+    """
+    Get the ID and name of all configurations.
+
+    :param bam_client: The client to use, if not the one of the current request.
+    :return: The list of configurations.
+    """
+    return cached_get("/configurations", LIST_PARAMS, bam_client=bam_client)["data"]
+
+
+def get_views(configuration_id, bam_client=None):
+    """
+    Get the ID and name of all views under a configuration.
+
+    :param configuration_id: The ID of the configuration.
+    :param bam_client: The client to use, if not the one of the current request.
+    :return: The list of views.
+    """
+    return cached_get(
+        f"/configurations/{configuration_id}/views", LIST_PARAMS, bam_client=bam_client
+    )["data"]
+
+
+def get_zones(view_id, bam_client=None):
+    """
+    Get the ID and name of all top-level zones under a view.
+
+    :param view_id: The ID of the view.
+    :param bam_client: The client to use, if not the one of the current request.
+    :return: The list of zones.
+    """
+    return cached_get(
+        f"/views/{view_id}/zones", ZONE_LIST_PARAMS, bam_client=bam_client
+    )["data"]
+
+
+def get_tree(depth, configuration_id=None, view_id=None):
+    """
+    Get the hierarchy of configurations, views and zones down to a depth. The
+    listings of each level are fetched concurrently.
+
+    Every node has ``children``, which is ``None`` if the node was not expanded
+    and can be requested separately.
+
+    :param depth: The number of levels to include, from 1 (configurations only)
+        to 3 (configurations, views and zones).
+    :param configuration_id: If specified, only this configuration is expanded.
+    :param view_id: If specified, only this view is expanded.
+    :return: The list of configuration nodes.
+    """
+    bam_client = client()
+    loaders = (None, get_views, get_zones)
+    selected = (None, configuration_id, view_id)
+    nodes = [
+        {"id": c["id"], "name": c["name"], "children": None}
+        for c in get_configurations(bam_client)
+    ]
+    tree = nodes
+    for level in range(1, min(depth, len(LEVELS))):
+        parents = [
+            node
+            for node in nodes
+            if not selected[level] or str(node["id"]) == str(selected[level])
+        ]
+        nodes = []
+        results = run_bounded(
+            lambda node, load=loaders[level]: load(node["id"], bam_client),
+            parents,
+            TREE_CONCURRENCY,
+        )
+        for parent, children, error in results:
+            if error:
+                raise error
+            parent["children"] = [
+                {"id": c["id"], "name": c["name"], "children": None} for c in children
+            ]
+            nodes.extend(parent["children"])
+    return tree
+
+
+def tree_request():
+    """
+    Handle a request for the hierarchy. The query string may contain ``depth``,
+    the number of levels to include, and ``configuration`` and ``view``, the IDs
+    of the only configuration and view to expand.
+
+    :return: The hierarchy in a JSON-serializable form.
+    """
+    depth = request.args.get("depth", 1, type=int)
+    if not 1 <= depth <= len(LEVELS):
+        raise BadRequestError(
+            "Depth is not valid",
+            details=FieldError("depth", f"Use a depth from 1 to {len(LEVELS)}."),
+        )
+    configuration_id = request.args.get("configuration")
+    if configuration_id:
+        remember_configuration(configuration_id)
+    return {
+        "configurations": get_tree(depth, configuration_id, request.args.get("view"))
+    }
+
+
+def remember_configuration(configuration_id):
+    """
+    Remember in the session the configuration the user is working with, so its
+    listings can be preloaded the next time a workflow page is opened.
+
+    :param configuration_id: The ID of the configuration.
+    """
+    if session.get(LAST_CONFIGURATION_KEY) != str(configuration_id):
+        session[LAST_CONFIGURATION_KEY] = str(configuration_id)
+
+
+def warm():
+    """
+    Start loading into the cache, without waiting for it, the listings a workflow
+    page requests right after it is opened: the configurations, and the views and
+    zones of the configuration the user last worked with.
+
+    Nothing is done if the same listings are already pending for the user, or if
+    too many preloads are pending.
+    """
+    bam_client = client(BULK)
+    key = (bam_client.principal, session.get(LAST_CONFIGURATION_KEY))
+    with _warm_lock:
+        if key in _warm_pending or len(_warm_pending) >= WARM_PENDING:
+            return
+        _warm_pending.add(key)
+    _warmer.submit(_warm, bam_client, key)
+
+
+def _warm(bam_client, key):
+    configuration_id = key[1]
+    try:
+        get_configurations(bam_client)
+        if not configuration_id:
+            return
+        views = get_views(configuration_id, bam_client)
+        for _ in run_bounded(
+            lambda view: get_zones(view["id"], bam_client), views, TREE_CONCURRENCY
+        ):
+            pass
+    except Exception:  # pylint: disable=broad-except
+        # The listings are requested again by the page, which reports any error.
+        pass
+    finally:
+        with _warm_lock:
+            _warm_pending.discard(key)
+
+
+def invalidate(path_prefix=None):
+    """
+    Drop cached responses of all users after a modification in BAM.
+
+    :param path_prefix: Only the responses for paths starting with this prefix are
+        dropped. All responses are dropped if not specified.
+    """
+    if path_prefix is None:
+        _cache.invalidate()
+    else:
+        _cache.invalidate(lambda key: key[1].startswith(path_prefix))
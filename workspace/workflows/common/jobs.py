@@ -0,0 +1,311 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Background execution of BAM write operations with their status kept on disk."""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, request
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+from . import bam
+
+#: The directory where the status of jobs is kept. If not set, a directory named
+#: ``workflow_jobs`` in the instance folder of the web application is used.
+JOBS_DIR = os.environ.get("WORKFLOW_JOBS_DIR")
+
+#: The permissions of the files with the status of jobs, which only the user
+#: running the gateway can read.
+FILE_MODE = 0o600
+
+#: The number of jobs run concurrently by each gateway process.
+JOB_WORKERS = 4
+
+#: The number of seconds the status of a finished job is kept.
+JOB_RETENTION = 24 * 60 * 60
+
+#: The maximum number of jobs waiting to run in each gateway process.
+MAX_QUEUED_JOBS = 1000
+
+#: The number of seconds between the signs of life of a gateway process with a
+#: job queue.
+HEARTBEAT_INTERVAL = 30
+
+#: The number of seconds without a sign of life after which the jobs of a
+#: gateway process are considered interrupted.
+HEARTBEAT_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+#: The identifier of this run of the gateway process. Unlike the process ID, it
+#: is not reused after a restart.
+BOOT_ID = uuid.uuid4().hex
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_ASYNC_VALUES = ("1", "true", "yes")
+
+
+class JobQueue:
+    """
+    An in-process queue of jobs run by a pool of worker threads.
+
+    The status of every job is written to a file, so it can be looked up by other
+    gateway processes and after a restart. The directory and files are only
+    accessible to the user running the gateway. Each process also touches a file
+    named after its :data:`BOOT_ID` periodically. Jobs that were not finished
+    when their process stopped are reported as failed, since the BAM session
+    they were submitted with is gone.
+
+    :param directory: The directory where the status of jobs is kept.
+    :param workers: The number of jobs run concurrently.
+    :param retention: The number of seconds the status of a job is kept.
+    """
+
+    def __init__(self, directory, workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.directory = directory
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="workflow-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pruned = 0.0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._beat()
+        threading.Thread(
+            target=self._heartbeat, name="workflow-job-heartbeat", daemon=True
+        ).start()
+
+    def submit(self, principal, kind, func, *args):
+        """
+        Add a job to the queue.
+
+        The function runs outside of the request context, so it must not rely on
+        ``flask.g`` or ``flask.request``.
+
+        :param principal: The name of the BAM user the job runs for.
+        :param kind: The kind of the job, e.g., ``add_text_record``.
+        :param func: The function that performs the job and returns a
+            JSON-serializable result.
+        :param args: The arguments of the function.
+        :return: The status of the job.
+        """
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job["status"] == QUEUED)
+        if queued >= MAX_QUEUED_JOBS:
+            raise BadRequestError(
+                "Too many operations are waiting",
+                details=FieldError("async", "Please try again later."),
+            )
+        self._prune()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "principal": principal,
+            "boot": BOOT_ID,
+            "status": QUEUED,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "error": None,
+        }
+        self._update(job)
+        self._executor.submit(self._run, job["id"], func, args)
+        return dict(job)
+
+    def get(self, principal, job_id):
+        """
+        Get the status of a job.
+
+        :param principal: The name of the BAM user asking for the job.
+        :param job_id: The ID of the job.
+        :return: The status of the job, or ``None`` if the user has no such job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            job = dict(job) if job else None
+        if job is None:
+            job = self._read(job_id)
+        if job is None or job["principal"] != principal:
+            return None
+        if job["status"] in (QUEUED, RUNNING) and not self._is_alive(job.get("boot")):
+            job.update(
+                status=FAILED,
+                finished=time.time(),
+                error="The operation was interrupted by a restart of the gateway.",
+            )
+            self._write(job)
+        return job
+
+    def _run(self, job_id, func, args):
+        self._update({"id": job_id, "status": RUNNING, "started": time.time()})
+        try:
+            result = func(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            self._update(
+                {
+                    "id": job_id,
+                    "status": FAILED,
+                    "finished": time.time(),
+                    "error": str(e),
+                }
+            )
+            return
+        self._update(
+            {"id": job_id, "status": DONE, "finished": time.time(), "result": result}
+        )
+
+    def _update(self, changes):
+        with self._lock:
+            job = self._jobs.setdefault(changes["id"], {})
+            job.update(changes)
+            job = dict(job)
+            if job["status"] in (DONE, FAILED):
+                del self._jobs[job["id"]]
+        self._write(job)
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            self._beat()
+
+    def _beat(self):
+        path = os.path.join(self.directory, f"{BOOT_ID}.alive")
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, FILE_MODE))
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _is_alive(self, boot_id):
+        if boot_id == BOOT_ID:
+            return True
+        if not boot_id or not boot_id.isalnum():
+            return False
+        try:
+            mtime = os.stat(os.path.join(self.directory, f"{boot_id}.alive")).st_mtime
+        except OSError:
+            return False
+        return time.time() - mtime < HEARTBEAT_TIMEOUT
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _read(self, job_id):
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, job):
+        path = self._path(job["id"])
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, FILE_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(temp, path)
+
+    def _prune(self):
+        now = time.time()
+        if now - self._pruned < 60:
+            return
+        self._pruned = now
+        for entry in os.scandir(self.directory):
+            try:
+                if now - entry.stat().st_mtime > self.retention:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """
+    Get the job queue of this gateway process, creating it if needed.
+
+    :return: The job queue.
+    """
+    global _queue  # pylint: disable=global-statement
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                JOBS_DIR or os.path.join(current_app.instance_path, "workflow_jobs")
+            )
+        return _queue
+
+
+def run(kind, func, *args):
+    """
+    Perform a write operation, in the background if the request has ``async`` set.
+
+    :param kind: The kind of the operation, e.g., ``add_text_record``.
+    :param func: The function that performs the operation and returns a
+        JSON-serializable result. It must not rely on ``flask.g`` or
+        ``flask.request``.
+    :param args: The arguments of the function.
+    :return: The result of the function, or the status of the queued job along
+        with status code 202.
+    """
+    if request.values.get("async", "").lower() not in _ASYNC_VALUES:
+        return func(*args)
+    job = get_queue().submit(bam.current_principal(), kind, func, *args)
+    return {"message": "The operation was queued.", "job": _public(job)}, 202
+
+
+def status(job_id):
+    """
+    Get the status of a job of the user of the current request.
+
+    :param job_id: The ID of the job.
+    :return: The status of the job in a JSON-serializable form.
+    """
+    job = get_queue().get(bam.current_principal(), job_id)
+    if job is None:
+        raise BadRequestError(
+            "Job not found",
+            details=FieldError("job", "The job does not exist or has expired."),
+        )
+    return _public(job)
+
+
+def _public(job):
+    """
+    Get the status of a job without the details internal to the gateway.
+
+    :param job: The status of the job.
+    :return: The status without the owner and process of the job.
+    """
+    return {
+        key: value for key, value in job.items() if key not in ("principal", "boot")
+    }
@@ -0,0 +1,218 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Adaptive limit of the number of concurrent calls to BAM made by a gateway
+process.
+
+The limit follows additive-increase/multiplicative-decrease: it grows slowly
+while BAM answers as fast as usual and it is shrunk when BAM slows down or
+answers with status 429 or 503. Calls made for interactive page lookups are
+admitted before bulk calls, and part of the limit is kept free for them.
+"""
+import os
+import threading
+import time
+
+from . import pool
+from .metrics import Gauge, Histogram, error_status
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+#: The lanes of calls, from the highest priority.
+LANES = (INTERACTIVE, BULK)
+
+#: The number of concurrent calls allowed at first.
+INITIAL_LIMIT = 8
+
+#: The lowest number of concurrent calls allowed.
+MIN_LIMIT = 2
+
+#: The highest number of concurrent calls allowed.
+MAX_LIMIT = int(os.environ.get("WORKFLOW_BAM_MAX_CONCURRENCY", str(pool.POOL_SIZE)))
+
+#: The share of the limit that bulk calls cannot use.
+INTERACTIVE_RESERVE = 0.25
+
+#: How many times slower than usual the smoothed latency of a kind of call can be
+#: before BAM is considered overloaded.
+LATENCY_TOLERANCE = 1.5
+
+#: The latency, in seconds, below which a call is never considered slow.
+LATENCY_FLOOR = 0.005
+
+#: The weight of each new latency in the smoothed latency of its kind of call.
+SMOOTHING = 0.1
+
+#: The number of consecutive calls of a kind whose smoothed latency must be too
+#: high before the limit is decreased, so that the jitter of single calls does
+#: not shrink it.
+SLOW_CALLS = 5
+
+#: The factor the limit is multiplied by when BAM is overloaded.
+BACKOFF = 0.8
+
+#: The number of seconds over which the lowest smoothed latency of a kind of
+#: call is taken as its usual latency. The usual latency reflects changes in BAM
+#: within twice this period.
+BASELINE_WINDOW = 30.0
+
+_OVERLOAD_STATUSES = ("429", "503")
+
+
+class AdaptiveLimiter:
+    """
+    A limit of concurrent calls that adapts to the latency of BAM.
+
+    The latency of each kind of call is smoothed with an exponentially weighted
+    moving average, and its usual latency is the lowest smoothed latency over
+    the last one or two windows. BAM is considered overloaded when it answers
+    with 429 or 503, or when the smoothed latency stays too far above the usual
+    one for several calls in a row. The latency is tracked separately for each
+    kind of call, since a listing of thousands of objects is always slower than
+    reading one.
+
+    :param initial: The number of concurrent calls allowed at first.
+    :param minimum: The lowest number of concurrent calls allowed.
+    :param maximum: The highest number of concurrent calls allowed.
+    """
+
+    def __init__(self, initial=INITIAL_LIMIT, minimum=MIN_LIMIT, maximum=MAX_LIMIT):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(max(minimum, min(initial, self.maximum)))
+        self.in_flight = {lane: 0 for lane in LANES}
+        self._waiting = {lane: 0 for lane in LANES}
+        self._stats = {}
+        self._decreased = 0.0
+        self._cond = threading.Condition()
+
+    def call(self, lane, key, func):
+        """
+        Make a call once the limit allows it.
+
+        :param lane: The lane of the call, one of :data:`LANES`.
+        :param key: The kind of the call, e.g., its method and templated path.
+        :param func: A callable without arguments that makes the call.
+        :return: The result of the call.
+        """
+        self._acquire(lane)
+        start = time.perf_counter()
+        outcome = None
+        try:
+            result = func()
+            outcome = "ok"
+            return result
+        except Exception as e:
+            if error_status(e) in _OVERLOAD_STATUSES:
+                outcome = "overloaded"
+            raise
+        finally:
+            self._release(lane, key, time.perf_counter() - start, outcome)
+
+    def _capacity(self, lane):
+        limit = int(self.limit)
+        if lane == BULK:
+            return max(1, limit - max(1, int(limit * INTERACTIVE_RESERVE)))
+        return limit
+
+    def _admits(self, lane):
+        if lane == BULK and self._waiting[INTERACTIVE]:
+            return False
+        return sum(self.in_flight.values()) < self._capacity(lane)
+
+    def _acquire(self, lane):
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while not self._admits(lane):
+                    self._cond.wait()
+            finally:
+                self._waiting[lane] -= 1
+            self.in_flight[lane] += 1
+        LIMITER_WAIT.observe((lane,), time.perf_counter() - start)
+
+    def _release(self, lane, key, latency, outcome):
+        with self._cond:
+            self.in_flight[lane] -= 1
+            if outcome is not None:
+                self._adjust(key, latency, outcome == "overloaded")
+            self._cond.notify_all()
+
+    def _is_slow(self, key, latency):
+        now = time.monotonic()
+        stats = self._stats.get(key)
+        if stats is None or now - stats["started"] > 2 * BASELINE_WINDOW:
+            stats = self._stats[key] = {
+                "smoothed": latency,
+                "started": now,
+                "lowest": latency,
+                "previous": latency,
+                "slow": 0,
+            }
+        else:
+            stats["smoothed"] += SMOOTHING * (latency - stats["smoothed"])
+        smoothed = stats["smoothed"]
+        if now - stats["started"] > BASELINE_WINDOW:
+            stats.update(started=now, lowest=smoothed, previous=stats["lowest"])
+        else:
+            stats["lowest"] = min(stats["lowest"], smoothed)
+        baseline = min(stats["lowest"], stats["previous"])
+        if smoothed > max(baseline * LATENCY_TOLERANCE, LATENCY_FLOOR):
+            stats["slow"] += 1
+        else:
+            stats["slow"] = 0
+        return stats["slow"] >= SLOW_CALLS
+
+    def _adjust(self, key, latency, overloaded):
+        if overloaded or self._is_slow(key, latency):
+            # Decrease at most once per round trip, since the calls that are
+            # already in flight were admitted under the previous limit.
+            now = time.monotonic()
+            if now - self._decreased > latency:
+                self.limit = max(self.minimum, self.limit * BACKOFF)
+                self._decreased = now
+        elif sum(self.in_flight.values()) + 1 >= self.limit / 2:
+            # Only grow a limit that is actually used.
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+LIMITER = AdaptiveLimiter()
+
+LIMITER_WAIT = Histogram(
+    "workflow_bam_limiter_wait_seconds",
+    "Time calls to BAM waited to be admitted by the concurrency limit.",
+    ("lane",),
+)
+
+Gauge(
+    "workflow_bam_concurrency_limit",
+    "The current limit of concurrent calls to BAM.",
+    (),
+    lambda: {(): round(LIMITER.limit, 2)},
+)
+
+Gauge(
+    "workflow_bam_calls_in_flight",
+    "The number of calls to BAM in progress, by lane.",
+    ("lane",),
+    lambda: {(lane,): count for lane, count in LIMITER.in_flight.items()},
+)
@@ -0,0 +1,311 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Latency metrics of the workflow routes and of their calls to BAM, exposed in the
+Prometheus text format on ``/metrics``.
+
+The endpoint is only available when a token is configured with
+``WORKFLOW_METRICS_TOKEN``, and requires it as a bearer token.
+"""
+import bisect
+import hmac
+import os
+import re
+import threading
+import time
+
+from flask import Response, g, request
+
+#: The token that scrapers of the metrics must send. The metrics are not exposed
+#: if not set.
+METRICS_TOKEN = os.environ.get("WORKFLOW_METRICS_TOKEN", "")
+
+#: The upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+_collectors = []
+
+
+class Histogram:
+    """
+    A set of latency histograms, one per combination of label values.
+
+    :param name: The name of the metric.
+    :param description: The help text of the metric.
+    :param label_names: The names of the labels.
+    """
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+        _collectors.append(self)
+
+    def observe(self, labels, value):
+        """
+        Record an observed value.
+
+        :param labels: A tuple of label values, in the order of the label names.
+        :param value: The observed value, in seconds.
+        """
+        position = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(BUCKETS) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def render(self):
+        """
+        Render the histograms in the Prometheus text format.
+
+        :return: The lines of text.
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(
+                (labels, list(c), s) for labels, (c, s) in self._series.items()
+            )
+        for labels, counts, total in series:
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    A set of counters, one per combination of label values.
+
+    :param name: The name of the metric.
+    :param description: The help text of the metric.
+    :param label_names: The names of the labels.
+    """
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+        _collectors.append(self)
+
+    def inc(self, labels, amount=1):
+        """
+        Increase a counter.
+
+        :param labels: A tuple of label values, in the order of the label names.
+        :param amount: The amount to add.
+        """
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        """
+        Render the counters in the Prometheus text format.
+
+        :return: The lines of text.
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, count in series:
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    A set of gauges whose values are read when the metrics are rendered.
+
+    :param name: The name of the metric.
+    :param description: The help text of the metric.
+    :param label_names: The names of the labels.
+    :param read: A callable without arguments that returns a dictionary of the
+        current values by tuples of label values.
+    """
+
+    def __init__(self, name, description, label_names, read):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.read = read
+        _collectors.append(self)
+
+    def render(self):
+        """
+        Render the gauges in the Prometheus text format.
+
+        :return: The lines of text.
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+        ]
+        for labels, current in sorted(self.read().items()):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {current}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+ROUTE_LATENCY = Histogram(
+    "workflow_http_request_duration_seconds",
+    "Latency of requests handled by the workflow routes.",
+    ("route", "method", "status"),
+)
+
+BAM_LATENCY = Histogram(
+    "workflow_bam_request_duration_seconds",
+    "Latency of requests made to BAM REST v2 API by the workflows.",
+    ("method", "path", "status"),
+)
+
+
+def template_path(path):
+    """
+    Replace the object IDs in the path of a BAM resource with a placeholder.
+
+    :param path: The path of the resource, e.g., ``/zones/123/resourceRecords``.
+    :return: The templated path, e.g., ``/zones/{id}/resourceRecords``.
+    """
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+
+def error_status(error):
+    """
+    Get the label value for the status of a failed call.
+
+    :param error: The exception raised by the call.
+    :return: The HTTP status code, if known, otherwise ``error``.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return str(status) if isinstance(status, int) else "error"
+
+
+def timed_bam_call(method, path, func):
+    """
+    Call BAM and record the latency of the call.
+
+    :param method: The HTTP method of the request.
+    :param path: The path of the resource.
+    :param func: A callable without arguments that makes the request.
+    :return: The result of the call.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        return func()
+    except Exception as e:
+        status = error_status(e)
+        raise
+    finally:
+        BAM_LATENCY.observe(
+            (method, template_path(path), status), time.perf_counter() - start
+        )
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        ROUTE_LATENCY.observe(
+            (rule, request.method, str(response.status_code)),
+            time.perf_counter() - start,
+        )
+    return response
+
+
+def metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    :return: Response with the metrics, or with status 401 if the request does
+        not have the token.
+    """
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")
+    ):
+        return Response(
+            "Unauthorized\n",
+            status=401,
+            headers={"WWW-Authenticate": 'Bearer realm="metrics"'},
+            content_type="text/plain; charset=utf-8",
+        )
+    lines = [line for collector in _collectors for line in collector.render()]
+    return Response(
+        "\n".join(lines) + "\n",
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def install(application):
+    """
+    Install the collection of metrics and the ``/metrics`` endpoint in the web
+    application. The endpoint is only added if :data:`METRICS_TOKEN` is set.
+    Installing it more than once has no effect.
+
+    :param application: The web application.
+    """
+    if "workflow_metrics" in application.extensions:
+        return
+    application.extensions["workflow_metrics"] = True
+    application.before_request(_before_request)
+    application.after_request(_after_request)
+    if METRICS_TOKEN:
+        application.add_url_rule(
+            "/metrics", endpoint="workflow_metrics", view_func=metrics
+        )
@@ -0,0 +1,230 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Offset-based paging through BAM REST v2 API collections."""
+import csv
+import io
+import itertools
+import logging
+
+from flask import Response, stream_with_context
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+from . import bam, bulk
+from .serialization import dumps
+
+#: The number of objects requested from BAM per page.
+DEFAULT_PAGE_SIZE = 1000
+
+#: The maximum number of objects that can be requested per page.
+MAX_PAGE_SIZE = 9999
+
+#: The first column of the row that ends a CSV response whose rows could not all
+#: be retrieved. The second column has the error message.
+CSV_ERROR_MARKER = "#error"
+
+_logger = logging.getLogger(__name__)
+
+
+def iter_resources(
+    path, params=None, page_size=DEFAULT_PAGE_SIZE, offset=0, bam_client=None
+):
+    """
+    Iterate over the objects of a collection, fetching them from BAM one page at a
+    time.
+
+    :param path: The path of the collection.
+    :param params: The query parameters of the request, without the ``offset`` and
+        ``limit``.
+    :param page_size: The number of objects to fetch per request.
+    :param offset: The number of objects to skip.
+    :param bam_client: The client to use. The one of the current request is used
+        if not specified.
+    :return: A generator of objects.
+    """
+    bam_client = bam_client or bam.client()
+    params = params or {}
+    while True:
+        page = bam_client.http_get(
+            path,
+            params={**params, "offset": str(offset), "limit": str(page_size)},
+        )["data"]
+        yield from page
+        if len(page) < page_size:
+            return
+        offset += len(page)
+
+
+def iter_resources_concurrently(
+    path,
+    params=None,
+    page_size=DEFAULT_PAGE_SIZE,
+    offset=0,
+    concurrency=bulk.DEFAULT_CONCURRENCY,
+):
+    """
+    Iterate over the objects of a collection, fetching several pages from BAM at a
+    time. The objects are returned in the same order as by
+    :func:`iter_resources`, and only a bounded number of pages is held in memory.
+
+    Since the size of the collection is not known in advance, up to twice the
+    concurrency of pages past its end may be requested.
+
+    :param path: The path of the collection.
+    :param params: The query parameters of the request, without the ``offset`` and
+        ``limit``.
+    :param page_size: The number of objects to fetch per request.
+    :param offset: The number of objects to skip.
+    :param concurrency: The maximum number of concurrent requests.
+    :return: A generator of objects.
+    """
+    bam_client = bam.client()
+    params = params or {}
+
+    def fetch(page_offset):
+        return bam_client.http_get(
+            path,
+            params={**params, "offset": str(page_offset), "limit": str(page_size)},
+        )["data"]
+
+    offsets = itertools.count(offset, page_size)
+    for _, page, error in bulk.run_bounded(fetch, offsets, concurrency):
+        if error:
+            raise error
+        yield from page
+        if len(page) < page_size:
+            return
+
+
+def get_page(path, params, cursor, limit=None):
+    """
+    Get one page of the objects of a collection.
+
+    :param path: The path of the collection.
+    :param params: The query parameters of the request, without the ``offset`` and
+        ``limit``.
+    :param cursor: The cursor returned with the previous page, or an empty string
+        for the first page.
+    :param limit: The number of objects in the page.
+    :return: A tuple of the objects and the cursor for the next page, or ``None``
+        if this is the last page.
+    """
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        raise BadRequestError(
+            "Invalid cursor", details=FieldError("cursor", "Restart the listing.")
+        )
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    page = bam.client().http_get(
+        path, params={**params, "offset": str(offset), "limit": str(limit)}
+    )["data"]
+    next_cursor = str(offset + len(page)) if len(page) == limit else None
+    return page, next_cursor
+
+
+def _prefetch(items):
+    """
+    Get the first item of an iterable before a response is started, so that an
+    error in getting it results in an error response rather than in an empty
+    body.
+
+    :param items: An iterable.
+    :return: An iterator over the same items.
+    """
+    items = iter(items)
+    try:
+        first = next(items)
+    except StopIteration:
+        return iter(())
+    return itertools.chain((first,), items)
+
+
+def _incomplete(error):
+    _logger.error("Failed to stream a response: %s", error, exc_info=error)
+    return f"The response is incomplete: {error}"
+
+
+def ndjson_response(items, filename=None):
+    """
+    Create a response that streams objects as newline-delimited JSON.
+
+    The first object is retrieved before the response is created, so that errors
+    in retrieving it are raised. If retrieving a later object fails, the response
+    ends with an object that only has an ``error`` message.
+
+    :param items: An iterable of JSON-serializable objects.
+    :param filename: The name of the file offered to the browser, if the response
+        is to be downloaded.
+    :return: The streamed response.
+    """
+    items = _prefetch(items)
+
+    def lines():
+        try:
+            for item in items:
+                yield dumps(item) + b"\n"
+        except Exception as e:  # pylint: disable=broad-except
+            yield dumps({"error": _incomplete(e)}) + b"\n"
+
+    response = Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+    if filename:
+        response.headers.set("Content-Disposition", "attachment", filename=filename)
+    return response
+
+
+def csv_response(rows, fieldnames, filename=None):
+    """
+    Create a response that streams rows as CSV with a header line.
+
+    The first row is retrieved before the response is created, so that errors in
+    retrieving it are raised. If retrieving a later row fails, the response ends
+    with a row of :data:`CSV_ERROR_MARKER` and the error message.
+
+    :param rows: An iterable of dictionaries. Keys not in ``fieldnames`` are
+        ignored.
+    :param fieldnames: The columns of the CSV.
+    :param filename: The name of the file offered to the browser, if the response
+        is to be downloaded.
+    :return: The streamed response.
+    """
+    rows = _prefetch(rows)
+
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        try:
+            for row in rows:
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        except Exception as e:  # pylint: disable=broad-except
+            csv.writer(buffer).writerow((CSV_ERROR_MARKER, _incomplete(e)))
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(lines()), mimetype="text/csv")
+    if filename:
+        response.headers.set("Content-Disposition", "attachment", filename=filename)
+    return response
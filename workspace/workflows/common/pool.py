@@ -0,0 +1,149 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Pooled keep-alive HTTP connections to BAM, shared by all users of a gateway
+process.
+
+The connections carry no user state, since BAM REST v2 API authenticates each
+request by its headers, so the BAM clients of all users can share one pool per
+BAM host.
+"""
+import os
+import threading
+import time
+
+# pylint: disable=import-error
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+from .metrics import Counter, Histogram
+
+#: The maximum number of connections kept open to each BAM host.
+POOL_SIZE = int(os.environ.get("WORKFLOW_BAM_POOL_SIZE", "32"))
+
+#: The number of seconds after which an unused connection is closed instead of
+#: being reused.
+POOL_IDLE_TIMEOUT = float(os.environ.get("WORKFLOW_BAM_POOL_IDLE_TIMEOUT", "60"))
+
+#: The maximum number of BAM hosts connections are kept open to.
+POOL_HOSTS = 4
+
+POOL_ACQUISITIONS = Counter(
+    "workflow_bam_pool_acquisitions_total",
+    "Connections to BAM taken from the pool, by whether they were reused.",
+    ("host", "connection"),
+)
+
+POOL_EVICTIONS = Counter(
+    "workflow_bam_pool_evictions_total",
+    "Connections to BAM closed by the pool, by reason.",
+    ("host", "reason"),
+)
+
+POOL_WAIT = Histogram(
+    "workflow_bam_pool_wait_seconds",
+    "Time spent waiting for a free connection to BAM.",
+    ("host",),
+)
+
+
+class _PoolMixin:
+    """
+    Records the use of connections of a urllib3 connection pool and closes the
+    ones that are unused for too long.
+
+    urllib3 already closes connections dropped by the server when they are taken
+    from the pool. Such connections are counted as dead.
+    """
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        POOL_WAIT.observe((self.host,), time.perf_counter() - start)
+        released = getattr(conn, "workflow_released", None)
+        if released is not None:
+            conn.workflow_released = None
+            if getattr(conn, "sock", None) is None:
+                POOL_EVICTIONS.inc((self.host, "dead"))
+            elif time.monotonic() - released > POOL_IDLE_TIMEOUT:
+                conn.close()
+                POOL_EVICTIONS.inc((self.host, "idle"))
+        reused = getattr(conn, "sock", None) is not None
+        POOL_ACQUISITIONS.inc((self.host, "reused" if reused else "new"))
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None and getattr(conn, "sock", None) is not None:
+            conn.workflow_released = time.monotonic()
+        super()._put_conn(conn)
+
+
+class _HTTPConnectionPool(_PoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _HTTPSConnectionPool(_PoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    A transport adapter whose connection pools record their use and close idle
+    connections. When all connections to a host are in use, requests wait for
+    one to be released instead of opening more.
+    """
+
+    def __init__(self):
+        super().__init__(
+            pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, pool_block=True
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
+
+
+_adapter = None
+_lock = threading.Lock()
+
+
+def install(api):
+    """
+    Make a BAM REST v2 API client use the shared connection pools. Installing
+    them more than once has no effect.
+
+    :param api: The BAM REST v2 API client.
+    """
+    global _adapter  # pylint: disable=global-statement
+    session = getattr(api, "session", None)
+    if not isinstance(session, requests.Session):
+        return
+    if getattr(session, "workflow_pooled", False):
+        return
+    with _lock:
+        if _adapter is None:
+            _adapter = PooledAdapter()
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        session.workflow_pooled = True
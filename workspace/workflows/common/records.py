@@ -0,0 +1,493 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+TXT records: listing, request bodies, an index of existing records for rejecting
+duplicates, feeds of their changes, and reconciliation with a desired state.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+from . import bam, changefeed, paging, search
+from .bulk import run_bounded
+from .cache import TTLCache
+
+# NOTE: Records are paged by offset, so they must be ordered by a unique key.
+# Many records share a name, and ties could repeat or skip records between pages.
+TXT_RECORD_PARAMS = {
+    "fields": "id,name,text",
+    "filter": "type:eq('TXTRecord')",
+    "orderBy": "asc(id)",
+}
+
+#: The number of seconds the index of the records of a zone stays valid.
+RECORD_INDEX_TTL = 300.0
+
+#: The maximum number of zone indexes kept.
+RECORD_INDEX_SIZE = 256
+
+ADD = "add"
+UPDATE = "update"
+DELETE = "delete"
+
+#: The kinds of writes of a reconciliation plan, in the order they are made.
+ACTIONS = (DELETE, UPDATE, ADD)
+
+
+def iter_txt_records(zone_id, bam_client=None):
+    """
+    Iterate over the TXT records under a zone, fetching them one page at a time.
+
+    :param zone_id: The ID of the zone.
+    :param bam_client: The client to use. The one of the current request is used
+        if not specified.
+    :return: A generator of records.
+    """
+    return paging.iter_resources(
+        f"/zones/{zone_id}/resourceRecords", TXT_RECORD_PARAMS, bam_client=bam_client
+    )
+
+
+def sort_for_display(records):
+    """
+    Sort records by name in descending order, as they are shown on the pages.
+
+    :param records: The records.
+    :return: A new sorted list.
+    """
+    return sorted(records, key=lambda record: record.get("name") or "", reverse=True)
+
+
+def _digest(name, text):
+    key = f"{(name or '').lower()}\0{text or ''}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+class RecordIndex:
+    """
+    The name and text pairs of the TXT records of a zone, kept as 64-bit digests
+    so that even large zones take little memory.
+
+    :param records: The records of the zone, each with an ``id``, ``name`` and
+        ``text``.
+    """
+
+    def __init__(self, records=()):
+        self._digests = {}
+        self._present = set()
+        self._reserved = set()
+        self._lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """
+        Add or replace a record.
+
+        :param record: The record, with an ``id``, ``name`` and ``text``.
+        """
+        digest = _digest(record.get("name"), record.get("text"))
+        with self._lock:
+            previous = self._digests.pop(str(record["id"]), None)
+            if previous is not None:
+                self._present.discard(previous)
+            self._digests[str(record["id"])] = digest
+            self._present.add(digest)
+
+    def remove(self, record_id):
+        """
+        Remove a record.
+
+        :param record_id: The ID of the record.
+        """
+        with self._lock:
+            digest = self._digests.pop(str(record_id), None)
+            if digest is not None:
+                self._present.discard(digest)
+
+    def contains(self, name, text):
+        """
+        Check whether the zone has a record with a name and text, or one is being
+        added.
+
+        :param name: The name of the record, relative to the zone.
+        :param text: The text of the record.
+        :return: Whether such a record exists.
+        """
+        digest = _digest(name, text)
+        with self._lock:
+            return digest in self._present or digest in self._reserved
+
+    def reserve(self, name, text):
+        """
+        Claim a name and text for a record about to be added, unless the zone
+        already has such a record or another one is being added.
+
+        :param name: The name of the record, relative to the zone.
+        :param text: The text of the record.
+        :return: Whether the name and text were claimed.
+        """
+        digest = _digest(name, text)
+        with self._lock:
+            if digest in self._present or digest in self._reserved:
+                return False
+            self._reserved.add(digest)
+            return True
+
+    def release(self, name, text):
+        """
+        Give up the claim of :meth:`reserve` once the record was added, or could
+        not be.
+
+        :param name: The name of the record, relative to the zone.
+        :param text: The text of the record.
+        """
+        with self._lock:
+            self._reserved.discard(_digest(name, text))
+
+    def digests(self):
+        """
+        Get the digests of the records.
+
+        :return: A dictionary of the digests by record ID.
+        """
+        with self._lock:
+            return dict(self._digests)
+
+    def __contains__(self, record_id):
+        return str(record_id) in self._digests
+
+
+_indexes = TTLCache(max_size=RECORD_INDEX_SIZE, ttl=RECORD_INDEX_TTL)
+
+
+def index_records(zone_id, records, principal=None):
+    """
+    Replace the index of the records of a zone after listing them.
+
+    :param zone_id: The ID of the zone.
+    :param records: All TXT records of the zone.
+    :param principal: The name of the BAM user who listed the records, if not the
+        user of the current request.
+    :return: The new index.
+    """
+    index = RecordIndex(records)
+    _indexes.set((principal or bam.current_principal(), str(zone_id)), index)
+    return index
+
+
+def get_index(zone_id, principal=None):
+    """
+    Get the index of the records of a zone, if the user recently listed them.
+
+    :param zone_id: The ID of the zone.
+    :param principal: The name of the BAM user, if not the user of the current
+        request.
+    :return: The index, or ``None``.
+    """
+    return _indexes.get((principal or bam.current_principal(), str(zone_id)))
+
+
+def check_not_duplicate(index, name, text):
+    """
+    Raises exception if an index shows that a record already exists
+
+    :param index: The index of the records of the zone, if any
+    :param name: The name of the record, relative to the zone
+    :param text: The text of the record
+    """
+    if index is not None and index.contains(name, text):
+        raise _duplicate_error()
+
+
+def _duplicate_error():
+    return BadRequestError(
+        "Text record already exists",
+        details=FieldError("text", "A record with this name and text already exists."),
+    )
+
+
+def _record_digest(record):
+    return _digest(record.get("name"), record.get("text"))
+
+
+@contextmanager
+def reserved(index, name, text):
+    """
+    Context manager that rejects a record that already exists or is being added,
+    and otherwise claims its name and text in the index while it is being added.
+    The claim is given up on exit, after the index was updated by
+    :func:`record_saved` or the record could not be added.
+
+    :param index: The index of the records of the zone, if any
+    :param name: The name of the record, relative to the zone
+    :param text: The text of the record
+    """
+    if index is None:
+        yield
+        return
+    if not index.reserve(name, text):
+        raise _duplicate_error()
+    try:
+        yield
+    finally:
+        index.release(name, text)
+
+
+def record_saved(zone_id, item, principal):
+    """
+    Update the search and duplicate indexes and the change feeds of the user who
+    wrote a record after it was added or updated. The matching indexes of other
+    users are dropped instead, since they may not be allowed to see the record,
+    and their feeds find the change with their own listings of the zone.
+
+    :param zone_id: The ID of the zone of the record. If not specified, only the
+        indexes that already contain the record are updated.
+    :param item: The new state of the record, with an ``id``, ``name`` and
+        ``text``.
+    :param principal: The name of the BAM user who wrote the record.
+    """
+    search.update_item("records", zone_id, item, principal)
+    for key in _indexes.keys():
+        if zone_id is not None and key[1] != str(zone_id):
+            continue
+        index = _indexes.get(key)
+        if index is None or (zone_id is None and item["id"] not in index):
+            continue
+        if key[0] == principal:
+            index.add(item)
+        else:
+            _indexes.invalidate(lambda other, key=key: other == key)
+    digest = _record_digest(item)
+    for feed in changefeed.iter_feeds(zone_id, principal):
+        feed.saved(item, digest, known_only=zone_id is None)
+
+
+def record_deleted(record_id, principal):
+    """
+    Update the search and duplicate indexes and the change feeds of the user who
+    deleted a record. The indexes of other users that contain the record are
+    dropped instead, and their feeds find the change with their own listings of
+    the zone.
+
+    :param record_id: The ID of the deleted record.
+    :param principal: The name of the BAM user who deleted the record.
+    """
+    search.remove_item("records", None, record_id)
+    for key in _indexes.keys():
+        index = _indexes.get(key)
+        if index is None:
+            continue
+        if key[0] == principal:
+            index.remove(record_id)
+        elif record_id in index:
+            _indexes.invalidate(lambda other, key=key: other == key)
+    for feed in changefeed.iter_feeds(principal=principal):
+        feed.deleted(record_id)
+
+
+def stream_record_changes(zone_id, last_event_id=None):
+    """
+    Stream the changes to the TXT records of a zone as Server-Sent Events. If
+    enabled with :data:`changefeed.POLL_INTERVAL`, the zone is listed again
+    periodically while the stream is open, so that changes made outside of the
+    gateway or by other users are found too, and the duplicate index of the user
+    is refreshed along the way.
+
+    :param zone_id: The ID of the zone.
+    :param last_event_id: The ID of the last event the browser received, when it
+        reconnects.
+    :return: The streamed response.
+    """
+    bam_client = bam.client()
+    principal = bam_client.principal
+    feed = changefeed.get_feed(principal, zone_id)
+    index = get_index(zone_id, principal)
+    if index is not None:
+        # The records the page has just listed, so changes made since then are
+        # found by the first listing of the feed.
+        feed.seed(index.digests())
+
+    def poll(target):
+        records = list(iter_txt_records(zone_id, bam_client))
+        index_records(zone_id, records, principal)
+        target.replace(records, _record_digest)
+
+    return changefeed.stream(principal, zone_id, last_event_id, poll)
+
+
+def validate_row(row):
+    """
+    Validates a row of an uploaded file and raises exception if it does not
+    describe a text record
+
+    :param row: The parsed row
+    """
+    if not isinstance(row.get("name") or "", str):
+        raise BadRequestError(
+            "Name must be a string",
+            details=FieldError("name", "Please provide a valid name."),
+        )
+
+    if not row.get("text") or not isinstance(row["text"], str):
+        raise BadRequestError(
+            "Text is not specified",
+            details=FieldError("text", "Please provide a text."),
+        )
+
+
+def build_text_record(name, text, zone_name, record_id=None):
+    """
+    Build the request headers and body for adding a text record to a zone, or for
+    updating one.
+
+    :param name: The name of the record, relative to the zone.
+    :param text: The text of the record.
+    :param zone_name: The absolute name of the zone.
+    :param record_id: The ID of the record, when updating it.
+    :return: A tuple of the headers and the body.
+    """
+    headers = {}
+    if name:
+        absolute_name = name + "." + zone_name
+    else:
+        absolute_name = None
+        headers = {"x-bcn-same-as-zone": "true"}
+
+    body = {
+        "type": "TXTRecord",
+        "name": name if name else None,
+        "text": text if text else None,
+        "absoluteName": absolute_name,
+    }
+    if record_id is not None:
+        body = {"id": record_id, **body}
+    return headers, body
+
+
+def plan_reconcile(current, desired):
+    """
+    Compute the fewest writes that turn the TXT records of a zone into a desired
+    set. Records that already have a desired name and text are left alone. Other
+    records with a desired name get one of the missing texts of that name, and
+    only the remaining records are added or deleted. Names are compared without
+    regard to case, like in DNS and in the duplicate index.
+
+    :param current: The records of the zone, each with an ``id``, ``name`` and
+        ``text``.
+    :param desired: The desired ``(name, text)`` pairs. Duplicates are ignored.
+    :return: A dictionary of the records to ``add`` (name and text), ``update``
+        (ID, name and new text) and ``delete`` (ID, name and text), and the number
+        of ``unchanged`` records.
+    """
+    wanted = defaultdict(dict)
+    spelling = {}
+    for name, text in desired:
+        key = (name or "").lower()
+        spelling.setdefault(key, name or "")
+        wanted[key][text] = True
+    existing = defaultdict(list)
+    for record in current:
+        existing[(record.get("name") or "").lower()].append(record)
+
+    plan = {ADD: [], UPDATE: [], DELETE: [], "unchanged": 0}
+    for key in sorted(set(wanted) | set(existing)):
+        missing = dict(wanted.get(key, {}))
+        spare = []
+        for record in existing.get(key, []):
+            if record.get("text") in missing:
+                del missing[record["text"]]
+                plan["unchanged"] += 1
+            else:
+                spare.append(record)
+        texts = list(missing)
+        name = spelling.get(key)
+        for record, text in zip(spare, texts):
+            plan[UPDATE].append({"id": record["id"], "name": name, "text": text})
+        for text in texts[len(spare) :]:
+            plan[ADD].append({"name": name, "text": text})
+        for record in spare[len(texts) :]:
+            plan[DELETE].append(
+                {
+                    "id": record["id"],
+                    "name": record.get("name") or "",
+                    "text": record.get("text"),
+                }
+            )
+    return plan
+
+
+def apply_reconcile(bam_client, zone_id, zone_name, plan, concurrency):
+    """
+    Perform the writes of a reconciliation plan. The writes of each kind are
+    made concurrently, and each kind is finished before the next one starts.
+
+    :param bam_client: The BAM client of the user.
+    :param zone_id: The ID of the zone.
+    :param zone_name: The absolute name of the zone.
+    :param plan: The plan, as returned by :func:`plan_reconcile`.
+    :param concurrency: The maximum number of concurrent writes.
+    :return: The steps that failed, each with its ``action`` and ``error``.
+    """
+
+    def delete(item):
+        bam_client.http_delete(f"/resourceRecords/{item['id']}")
+        record_deleted(item["id"], bam_client.principal)
+
+    def update(item):
+        headers, body = build_text_record(
+            item["name"], item["text"], zone_name, item["id"]
+        )
+        bam_client.http_put(
+            f"/resourceRecords/{item['id']}", headers=headers, json=body
+        )
+        record_saved(
+            zone_id,
+            {"id": item["id"], "name": body["name"], "text": body["text"]},
+            bam_client.principal,
+        )
+
+    def add(item):
+        headers, body = build_text_record(item["name"], item["text"], zone_name)
+        record = bam_client.http_post(
+            f"/zones/{zone_id}/resourceRecords",
+            params={"fields": "id"},
+            headers=headers,
+            json=body,
+        )
+        record_saved(
+            zone_id,
+            {"id": record["id"], "name": body["name"], "text": body["text"]},
+            bam_client.principal,
+        )
+
+    writers = {DELETE: delete, UPDATE: update, ADD: add}
+    failed = []
+    # Deletes are finished before updates and adds start, so that freed names do
+    # not clash with the records written after them.
+    for action in ACTIONS:
+        for item, _, error in run_bounded(writers[action], plan[action], concurrency):
+            if error:
+                failed.append({"action": action, **item, "error": str(error)})
+    return failed
@@ -0,0 +1,246 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Server-side name indexes backing the typeahead search endpoints."""
+import bisect
+import threading
+
+from flask import request
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+from . import bam, hierarchy
+from .cache import TTLCache
+
+#: The number of seconds an index stays valid before it is rebuilt from BAM.
+SEARCH_INDEX_TTL = 300.0
+
+#: The maximum number of indexes kept in memory.
+SEARCH_INDEX_COUNT = 256
+
+#: The number of results returned when the caller does not specify a limit.
+DEFAULT_LIMIT = 20
+
+#: The maximum number of results that can be requested.
+MAX_LIMIT = 100
+
+#: Loaders of the collections of the configuration, view and zone hierarchy.
+HIERARCHY_LOADERS = {
+    "configurations": lambda _: hierarchy.get_configurations(),
+    "views": hierarchy.get_views,
+    "zones": hierarchy.get_zones,
+}
+
+_indexes = TTLCache(max_size=SEARCH_INDEX_COUNT, ttl=SEARCH_INDEX_TTL)
+
+
+class NameIndex:
+    """
+    A case-insensitive index of objects sorted by name.
+
+    Prefix matches are found by bisecting the sorted names, substring matches are
+    only looked for if there are not enough prefix matches.
+
+    :param items: The objects to index. Each must have an ``id`` and a ``name``.
+    """
+
+    def __init__(self, items=()):
+        self._keys = []
+        self._items = []
+        self._key_by_id = {}
+        self._lock = threading.RLock()
+        for item in items:
+            self.add(item)
+
+    @staticmethod
+    def _key(item):
+        name = item.get("name") or ""
+        return (name.lower(), name, str(item["id"]))
+
+    def add(self, item):
+        """
+        Add an object to the index, replacing any object with the same ID.
+
+        :param item: The object to add.
+        """
+        key = self._key(item)
+        with self._lock:
+            self.remove(key[2])
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._items.insert(position, item)
+            self._key_by_id[key[2]] = key
+
+    def remove(self, item_id):
+        """
+        Remove an object from the index.
+
+        :param item_id: The ID of the object to remove.
+        """
+        with self._lock:
+            key = self._key_by_id.pop(str(item_id), None)
+            if key is not None:
+                position = bisect.bisect_left(self._keys, key)
+                del self._keys[position]
+                del self._items[position]
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """
+        Find the objects whose names contain a text.
+
+        :param text: The text to look for, compared case-insensitively.
+        :param limit: The maximum number of objects to return.
+        :return: The matching objects. Names starting with the text come first,
+            followed by names containing it elsewhere, each group in name order.
+        """
+        text = text.lower()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (text,))
+            end = start
+            while end < len(self._keys) and self._keys[end][0].startswith(text):
+                end += 1
+            results = self._items[start : min(end, start + limit)]
+            if len(results) < limit and text:
+                for position, key in enumerate(self._keys):
+                    if len(results) >= limit:
+                        break
+                    if (position < start or position >= end) and text in key[0]:
+                        results.append(self._items[position])
+            return results
+
+    def __contains__(self, item_id):
+        return str(item_id) in self._key_by_id
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def get_index(kind, parent_id, loader):
+    """
+    Get the index of a collection for the current user, building it if needed.
+
+    :param kind: The kind of objects in the collection, e.g., ``zones``.
+    :param parent_id: The ID of the object that contains the collection.
+    :param loader: A callable that receives the parent ID and returns the objects.
+    :return: The index of the collection.
+    """
+    key = (bam.current_principal(), kind, parent_id)
+    return _indexes.get_or_load(key, lambda: NameIndex(loader(parent_id)))
+
+
+def search(kind, parent_id, text, limit, loader):
+    """
+    Find objects in a collection whose names contain a text.
+
+    :param kind: The kind of objects in the collection, e.g., ``zones``.
+    :param parent_id: The ID of the object that contains the collection.
+    :param text: The text to look for.
+    :param limit: The maximum number of objects to return.
+    :param loader: A callable that receives the parent ID and returns the objects.
+    :return: The matching objects.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    return get_index(kind, parent_id, loader).search(text, limit)
+
+
+def search_request(loaders):
+    """
+    Handle a typeahead search request. The query string must contain ``kind``,
+    the kind of objects to search, ``parent``, the ID of the object containing
+    them, ``q``, the text to look for, and optionally ``limit``.
+
+    :param loaders: A mapping of the supported kinds to their loaders.
+    :return: The matching objects in a JSON-serializable form.
+    """
+    kind = request.args.get("kind", "")
+    if kind not in loaders:
+        raise BadRequestError(
+            f"Unsupported kind of objects: {kind}",
+            details=FieldError("kind", f"Use one of: {', '.join(loaders)}."),
+        )
+    parent_id = request.args.get("parent", "")
+    # Configurations are the top of the hierarchy, every other kind is listed
+    # under a parent object.
+    if kind != "configurations" and not parent_id.isdigit():
+        raise BadRequestError(
+            "Parent is not valid",
+            details=FieldError("parent", "Please provide the ID of the parent object."),
+        )
+    text = request.args.get("q", "")
+    limit = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    return {"results": search(kind, parent_id, text, limit, loaders[kind])}
+
+
+def _matching_keys(kind, parent_id):
+    return [
+        key for key in _indexes.keys() if key[1] == kind and parent_id in (None, key[2])
+    ]
+
+
+def update_item(kind, parent_id, item, principal):
+    """
+    Add or replace an object in the already built indexes of the user who wrote
+    it. The matching indexes of other users are dropped instead, since they may
+    not be allowed to see the object, and are rebuilt with their own permissions
+    on their next search.
+
+    :param kind: The kind of objects in the collection.
+    :param parent_id: The ID of the object that contains the collection. If not
+        specified, only collections that already contain the object are updated.
+    :param item: The new state of the object.
+    :param principal: The name of the BAM user who wrote the object.
+    """
+    if parent_id is not None:
+        parent_id = str(parent_id)
+    for key in _matching_keys(kind, parent_id):
+        index = _indexes.get(key)
+        if index is None or (parent_id is None and item["id"] not in index):
+            continue
+        if key[0] == principal:
+            index.add(item)
+        else:
+            _indexes.invalidate(lambda other, key=key: other == key)
+
+
+def remove_item(kind, parent_id, item_id):
+    """
+    Remove an object from the already built indexes of all users. Unlike an
+    addition, a removal reveals nothing to users who cannot see the object.
+
+    :param kind: The kind of objects in the collection.
+    :param parent_id: The ID of the object that contains the collection. The
+        object is looked for in all collections of the kind if not specified.
+    :param item_id: The ID of the removed object.
+    """
+    if parent_id is not None:
+        parent_id = str(parent_id)
+    for key in _matching_keys(kind, parent_id):
+        index = _indexes.get(key)
+        if index is not None:
+            index.remove(item_id)
+
+
+def invalidate(kind):
+    """
+    Drop all indexes of a kind, forcing them to be rebuilt on the next search.
+
+    :param kind: The kind of objects in the collection.
+    """
+    _indexes.invalidate(lambda key: key[1] == kind)
@@ -0,0 +1,83 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""JSON encoding of responses and slimming of BAM REST v2 API objects."""
+import json
+import re
+
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#: The keys of hypermedia data in BAM REST v2 API objects.
+HAL_KEYS = ("_links", "_embedded")
+
+_FIELDS = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*(,[A-Za-z_][A-Za-z0-9_.]*)*$")
+
+
+def dumps(payload):
+    """
+    Encode data as compact JSON with sorted keys. ``orjson`` is used if it is
+    installed, the standard library otherwise.
+
+    :param payload: The JSON-serializable data.
+    :return: The encoded data as bytes.
+    """
+    if orjson is not None:
+        # NOTE: orjson is a compiled extension that pylint cannot inspect.
+        # pylint: disable=no-member
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def strip_hal(obj):
+    """
+    Get a copy of a BAM REST v2 API object without its hypermedia data.
+
+    :param obj: The object.
+    :return: The object without ``_links`` and ``_embedded``.
+    """
+    return {key: value for key, value in obj.items() if key not in HAL_KEYS}
+
+
+def parse_fields(value, required=("id",)):
+    """
+    Parses the list of fields requested by the caller and raises exception if it
+    is not a comma-separated list of field names
+
+    :param value: The passed in list of fields, if any
+    :param required: The fields that are always included
+    :return: The value for the ``fields`` query parameter of BAM REST v2 API, or
+        ``None`` if all fields are requested
+    """
+    if not value:
+        return None
+    if not _FIELDS.match(value):
+        raise BadRequestError(
+            "Fields are not valid",
+            details=FieldError(
+                "fields", "Please provide a comma-separated list of field names."
+            ),
+        )
+    fields = value.split(",")
+    return ",".join(dict.fromkeys([*required, *fields]))
@@ -0,0 +1,143 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Start-up of the workflows: timing of their event handlers and, optionally, lazy
+loading of their routes.
+
+If the environment variable ``WORKFLOW_LAZY_ROUTES`` is set to ``1``, the
+routes module of a workflow is not imported when the gateway starts but on the
+first request to the URL prefix of the workflow.
+"""
+import contextlib
+import importlib
+import logging
+import os
+import threading
+import time
+
+from flask import Blueprint, Flask, request
+
+from .metrics import Gauge
+
+#: Whether the routes of workflows are loaded on their first request.
+LAZY_ROUTES = os.environ.get("WORKFLOW_LAZY_ROUTES", "") == "1"
+
+#: The number of seconds the start-up of all workflows should take at most, or
+#: ``0`` for no limit.
+STARTUP_BUDGET = float(os.environ.get("WORKFLOW_STARTUP_BUDGET", "0"))
+
+#: The phases of start-up that count towards the budget.
+STARTUP_PHASES = ("initialize", "attach")
+
+_HTTP_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+
+_logger = logging.getLogger(__name__)
+_timings = {}
+_timings_lock = threading.Lock()
+
+Gauge(
+    "workflow_startup_seconds",
+    "Time taken by each phase of the start-up of each workflow.",
+    ("workflow", "phase"),
+    lambda: dict(_timings),
+)
+
+
+@contextlib.contextmanager
+def timed(workflow, phase):
+    """
+    Context manager that records how long a phase of the start-up of a workflow
+    takes, and warns if the start-up of all workflows exceeds the budget.
+
+    :param workflow: The name of the workflow.
+    :param phase: The name of the phase, e.g., ``initialize``.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _timings_lock:
+            _timings[(workflow, phase)] = elapsed
+            total = sum(
+                value for (_, name), value in _timings.items() if name in STARTUP_PHASES
+            )
+        _logger.info("Workflow %s: %s took %.3f s", workflow, phase, elapsed)
+        if STARTUP_BUDGET and phase in STARTUP_PHASES and total > STARTUP_BUDGET:
+            _logger.warning(
+                "Start-up of workflows took %.3f s, over the budget of %.3f s",
+                total,
+                STARTUP_BUDGET,
+            )
+
+
+def report():
+    """
+    Get the recorded start-up timings.
+
+    :return: A dictionary of the number of seconds by workflow and phase.
+    """
+    with _timings_lock:
+        return dict(_timings)
+
+
+def register(application, bp, routes_module):
+    """
+    Register the blueprint of a workflow in the web application. If routes are
+    loaded lazily, a stand-in blueprint is registered instead, which loads the
+    routes module on the first request and then dispatches to its routes.
+
+    :param application: The web application.
+    :param bp: The blueprint of the workflow.
+    :param routes_module: The absolute name of the module that adds the routes
+        to the blueprint.
+    """
+    if not LAZY_ROUTES:
+        application.register_blueprint(bp)
+        return
+
+    loaded = {}
+    lock = threading.Lock()
+
+    def load():
+        with lock:
+            if "app" not in loaded:
+                with timed(bp.name, "load"):
+                    importlib.import_module(routes_module)
+                    # NOTE: Flask does not allow adding routes once requests are
+                    # served, so the routes are matched with a private
+                    # application and called in the context of the real one.
+                    routes_app = Flask(bp.import_name)
+                    routes_app.register_blueprint(bp)
+                loaded["app"] = routes_app
+            return loaded["app"]
+
+    def dispatch(**_):
+        routes_app = load()
+        adapter = routes_app.url_map.bind_to_environ(request.environ)
+        rule, view_args = adapter.match(return_rule=True)
+        request.url_rule = rule
+        request.view_args = view_args
+        return routes_app.view_functions[rule.endpoint](**view_args)
+
+    stand_in = Blueprint(bp.name, bp.import_name, url_prefix=bp.url_prefix)
+    stand_in.add_url_rule("/", "lazy", dispatch, methods=_HTTP_METHODS)
+    stand_in.add_url_rule("/<path:_>", "lazy_path", dispatch, methods=_HTTP_METHODS)
+    application.register_blueprint(stand_in)
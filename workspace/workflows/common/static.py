@@ -0,0 +1,108 @@
+# Copyright 2024 BlueCat Networks Inc.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Serving of the built UI: the HTML shell and content-hashed static assets."""
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+#: The precompressed variants of assets, in order of preference.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+#: The number of seconds content-hashed assets can be cached.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# NOTE: webpack puts a hash of at least 16 hex digits in the names of the built
+# assets, e.g., "js/addTextRecord.0123456789abcdef0123.js".
+_HASHED_NAME = re.compile(r"(^|[./])[0-9a-f]{16,}\.")
+
+#: The folders of the built UI that contain static assets.
+ASSET_FOLDERS = ("js", "img", "fonts")
+
+
+def send_page(directory, filename):
+    """
+    Send the HTML shell of a page. Browsers may keep it, but must revalidate it
+    on every use, so that they pick up new builds of the assets it references.
+
+    :param directory: The folder of the workflow.
+    :param filename: The path of the HTML file, relative to the folder.
+    :return: The response.
+    """
+    response = send_from_directory(directory, filename)
+    response.cache_control.no_cache = True
+    response.cache_control.public = False
+    return response
+
+
+def send_asset(directory, filename):
+    """
+    Send a static asset of the built UI. A precompressed variant is sent instead
+    if it exists and the client accepts its encoding. Assets whose names contain
+    a content hash never change, so clients may cache them for a long time.
+
+    :param directory: The folder of the workflow.
+    :param filename: The path of the asset, relative to the folder.
+    :return: The response.
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for name, suffix in PRECOMPRESSED:
+        if request.accept_encodings[name] and os.path.isfile(
+            os.path.join(directory, filename + suffix)
+        ):
+            encoding = name
+            filename += suffix
+            break
+
+    immutable = bool(_HASHED_NAME.search(filename))
+    response = send_from_directory(
+        directory,
+        filename,
+        mimetype=mimetype,
+        max_age=IMMUTABLE_MAX_AGE if immutable else None,
+    )
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def register_assets(bp, directory):
+    """
+    Add routes to a blueprint for the static assets of its built UI.
+
+    :param bp: The blueprint of the workflow.
+    :param directory: The folder of the workflow.
+    """
+
+    def asset(folder, filename):
+        return send_asset(directory, f"{folder}/{filename}")
+
+    for folder in ASSET_FOLDERS:
+        bp.add_url_rule(
+            f"/{folder}/<path:filename>",
+            endpoint=f"{folder}_asset",
+            view_func=asset,
+            defaults={"folder": folder},
+        )
@@ -22,7 +22,7 @@
 import json
 import os
 
-from flask import g, send_from_directory, request
+from flask import request
 
 # pylint: disable=import-error
 from bluecat.gateway.decorators import (
@@ -34,10 +34,18 @@ from bluecat.gateway.errors import (
     BadRequestError,
     FieldError,
 )  # pylint: disable=import-error
-from bluecat.util import no_cache  # pylint: disable=import-error
 
+from ..common import bam, changes, hierarchy, search, static
+from ..common.serialization import parse_fields, strip_hal
+from ..common.etag import conditional
 from .base import bp
 
+WORKFLOW_DIR = os.path.dirname(os.path.abspath(str(__file__)))
+
+static.register_assets(bp, WORKFLOW_DIR)
+
+CONFIGURATION_LIST_PARAMS = {"orderBy": "desc(name)", "limit": "99"}
+
 
 def validate_input(value):
     """
@@ -53,39 +61,94 @@ def validate_input(value):
 
 
 @bp.route("/get_configurations")
-@no_cache
 @api_exc_handler(default_message="Failed to get configurations.")
 @require_permission("configuration_details")
+@conditional
 def get_configurations():
     """Get configuration details.
 
+    The optional query parameter ``fields`` is a comma-separated list of the
+    fields to return. Hypermedia data is never returned.
+
     :return: Returns configurations data as a JSON response
     """
-    rdata = g.user.bam_api.v2.http_get(
-        "/configurations",
-        params={"orderBy": "desc(name)", "limit": "99"},
-    )
-    configurations = rdata["data"]
+    params = dict(CONFIGURATION_LIST_PARAMS)
+    fields = parse_fields(request.args.get("fields"))
+    if fields:
+        params["fields"] = fields
+    # NOTE: The listing is not cached, so that configurations added or deleted
+    # through other gateway processes or outside of the gateway show up at once.
+    # The entity tag still spares the transfer of an unchanged listing.
+    rdata = bam.client().http_get("/configurations", params=params)
+    configurations = [strip_hal(configuration) for configuration in rdata["data"]]
     return configurations
 
 
+@bp.route("/search")
+@api_exc_handler(default_message="Failed to search configurations.")
+@require_permission("configuration_details")
+def search_configurations():
+    """Search configurations by name.
+
+    The query string takes ``kind=configurations``, the text to look for in
+    ``q`` and the optional maximum number of results in ``limit``.
+
+    :return: Returns the matching configurations as a JSON response
+    """
+    return search.search_request(
+        {"configurations": search.HIERARCHY_LOADERS["configurations"]}
+    )
+
+
 @bp.route("/update_configuration", methods=["PUT"])
 @api_exc_handler(default_message="Failed to update configuration.")
 @require_permission("configuration_details")
 def update_configuration():
     """Update a configuration.
 
+    Only the fields that differ from the version loaded by the browser, passed
+    in the optional form field ``original``, are sent to BAM. Nothing is sent if
+    no field differs. The update is rejected if the configuration was changed
+    on the server since it was loaded.
+
     :return: Returns update status as a JSON response
     """
-    configuration: dict = json.loads(request.form["configuration"])
-    configuration.pop("_links")
+    configuration: dict = strip_hal(json.loads(request.form["configuration"]))
     entity_id = configuration["id"]
 
-    print(configuration)
     validate_input(configuration["id"])
     validate_input(configuration["name"])
 
-    g.user.bam_api.v2.http_put(f"/configurations/{entity_id}", json=configuration)
+    original = request.form.get("original")
+    original = strip_hal(json.loads(original)) if original else None
+    if original is not None and not changes.changed_fields(original, configuration):
+        return {"message": "Configuration is unchanged."}
+
+    client = bam.client()
+    current = client.http_get(f"/configurations/{entity_id}")
+    if original is not None:
+        conflicts = changes.conflicting_fields(original, current)
+        if conflicts:
+            raise BadRequestError(
+                f"Configuration {original.get('name')} was changed by another user",
+                details=FieldError(
+                    conflicts[0],
+                    "The value was changed by another user."
+                    " Please reload the configuration and try again.",
+                ),
+            )
+
+    patch = changes.changed_fields(current, configuration)
+    if not patch:
+        return {"message": "Configuration is unchanged."}
+
+    client.http_patch(
+        f"/configurations/{entity_id}",
+        json=patch,
+        headers={"Content-Type": changes.MERGE_PATCH},
+    )
+    hierarchy.invalidate("/configurations")
+    search.invalidate("configurations")
     return {"message": "Updated configuration successfully."}
 
 
@@ -100,9 +163,11 @@ def add_configuration():
     name = request.form["name"]
     description = request.form["description"]
     validate_input(name)
-    g.user.bam_api.v2.http_post(
+    bam.client().http_post(
         "/configurations", json={"name": name, "description": description}
     )
+    hierarchy.invalidate("/configurations")
+    search.invalidate("configurations")
     return {"message": f"Created configuration {name}."}
 
 
@@ -114,14 +179,15 @@ def delete_configuration(id):  # pylint: disable=redefined-builtin
 
     :return: Returns delete configuration status as a JSON response
     """
-    g.user.bam_api.v2.http_delete(
+    bam.client().http_delete(
         f"/configurations/{id}",
     )
+    hierarchy.invalidate("/configurations")
+    search.invalidate("configurations")
     return {"message": "Deleted configuration successfully."}
 
 
 @bp.route("/")
-@no_cache
 @page_exc_handler(default_message='Failed to load page "Configuration details".')
 @require_permission("configuration_details")
 def configuration_details():
@@ -129,7 +195,4 @@ def configuration_details():
     Renders the configuration_details page
     :return: configuration_details page HTML.
     """
-    return send_from_directory(
-        os.path.dirname(os.path.abspath(str(__file__))),
-        "html/configurationDetails/index.html",
-    )
+    return static.send_page(WORKFLOW_DIR, "html/configurationDetails/index.html")
@@ -20,7 +20,7 @@
 """Routes and back-end implementation of page ``get_object_details``."""
 import os
 
-from flask import send_from_directory, g, request
+from flask import request
 
 # pylint: disable=import-error
 from bluecat.gateway.decorators import (
@@ -28,10 +28,225 @@ from bluecat.gateway.decorators import (
     require_permission,
     page_exc_handler,
 )
+from bluecat.gateway.errors import (
+    BadRequestError,
+    FieldError,
+)  # pylint: disable=import-error
 from bluecat.util import no_cache  # pylint: disable=import-error
 
+from ..common import bam, bulk, static
+from ..common.cache import TTLCache
 from .base import bp
 
+WORKFLOW_DIR = os.path.dirname(os.path.abspath(str(__file__)))
+
+static.register_assets(bp, WORKFLOW_DIR)
+
+#: The maximum number of IDs in a single BAM query, keeping its URL short.
+IDS_PER_QUERY = 100
+
+#: The maximum number of IDs accepted in a single batch request.
+MAX_IDS_PER_REQUEST = 2000
+
+#: The maximum number of links followed from the object in a graph request.
+MAX_GRAPH_DEPTH = 5
+
+#: The maximum number of objects in a graph.
+MAX_GRAPH_NODES = 500
+
+#: The number of children listed per collection when the caller does not specify
+#: it.
+DEFAULT_CHILD_LIMIT = 50
+
+#: The maximum number of children listed per collection.
+MAX_CHILD_LIMIT = 1000
+
+#: The links to collections of child objects followed by default.
+DEFAULT_CHILD_LINKS = (
+    "views",
+    "zones",
+    "resourceRecords",
+    "blocks",
+    "networks",
+    "addresses",
+    "servers",
+)
+
+#: The number of links followed concurrently when expanding a graph.
+GRAPH_CONCURRENCY = 8
+
+# NOTE: The type of an object never changes and its name rarely does.
+_objects = TTLCache(max_size=10000, ttl=600.0)
+
+_links = TTLCache(max_size=5000, ttl=60.0)
+
+
+def parse_object_ids(value):
+    """
+    Parses a comma-separated list of object IDs and raises exception if it is
+    empty, too long or contains something other than IDs
+
+    :param value: The passed in list of IDs
+    :return: The unique IDs, in the order they were passed in
+    """
+    object_ids = list(
+        dict.fromkeys(part.strip() for part in value.split(",") if part.strip())
+    )
+    if not object_ids or not all(object_id.isdigit() for object_id in object_ids):
+        raise BadRequestError(
+            "Object IDs are not valid",
+            details=FieldError(
+                "objectIds", "Please provide a comma-separated list of object IDs."
+            ),
+        )
+    if len(object_ids) > MAX_IDS_PER_REQUEST:
+        raise BadRequestError(
+            "Too many object IDs",
+            details=FieldError(
+                "objectIds", f"Please provide at most {MAX_IDS_PER_REQUEST} IDs."
+            ),
+        )
+    return object_ids
+
+
+def lookup_objects(object_ids):
+    """
+    Get the name and type of objects. Objects that were looked up recently are
+    served from a cache, the rest are fetched with as few BAM queries as possible,
+    which are run concurrently.
+
+    :param object_ids: The IDs of the objects.
+    :return: A dictionary of the name and type by ID, with ``None`` for the IDs
+        of objects that do not exist.
+    """
+    bam_client = bam.client()
+    found = {}
+    missing = []
+    for object_id in object_ids:
+        data = _objects.get((bam_client.principal, object_id))
+        if data is None:
+            missing.append(object_id)
+        else:
+            found[object_id] = data
+
+    def fetch(chunk):
+        return bam_client.http_get(
+            "/",
+            params={
+                "filter": f"id:in({','.join(chunk)})",
+                "fields": "id,name,type",
+                "limit": str(len(chunk)),
+            },
+        )["data"]
+
+    chunks = [
+        missing[i : i + IDS_PER_QUERY] for i in range(0, len(missing), IDS_PER_QUERY)
+    ]
+    for _, objects, error in bulk.run_bounded(fetch, chunks):
+        if error:
+            raise error
+        for obj in objects:
+            data = {"name": obj["name"], "type": obj["type"]}
+            _objects.set((bam_client.principal, str(obj["id"])), data)
+            found[str(obj["id"])] = data
+    return {object_id: found.get(object_id) for object_id in object_ids}
+
+
+def _link_path(link):
+    href = link["href"]
+    return href.split("/api/v2", 1)[1] if "/api/v2" in href else href
+
+
+def _node(obj, distance):
+    return {
+        "id": obj["id"],
+        "name": obj.get("name"),
+        "type": obj.get("type"),
+        "distance": distance,
+        "parent": None,
+        "children": {},
+        "truncated": [],
+    }
+
+
+def expand_graph(object_id, depth, child_links, child_limit):
+    """
+    Get an object together with its ancestors and descendants, following the
+    links of BAM REST v2 API up to a depth. The links of each level are followed
+    concurrently. Linked resources fetched recently by the same user are reused.
+
+    :param object_id: The ID of the object.
+    :param depth: The number of links to follow from the object in each
+        direction.
+    :param child_links: The names of the links to collections of children to
+        follow.
+    :param child_limit: The maximum number of children listed per collection.
+    :return: The ID of the object and its graph, as a dictionary of nodes by ID,
+        or ``None`` if the object does not exist.
+    """
+    bam_client = bam.client()
+    rdata = bam_client.http_get("/", params={"filter": f"id:{object_id}"})["data"]
+    if not rdata:
+        return None
+
+    def fetch(task):
+        rel, _, path = task
+        params = {} if rel == "up" else {"limit": str(child_limit + 1)}
+        key = (bam_client.principal, path, tuple(sorted(params.items())))
+        return _links.get_or_load(
+            key, lambda: bam_client.http_get(path, params=params or None)
+        )
+
+    root = rdata[0]
+    nodes = {str(root["id"]): _node(root, 0)}
+    # Objects are expanded in the direction they were reached in, so that
+    # siblings of ancestors are not included.
+    frontier = [(root, ("up", "down"))]
+    for distance in range(1, depth + 1):
+        tasks = []
+        for obj, directions in frontier:
+            links = obj.get("_links") or {}
+            if "up" in directions and "up" in links:
+                tasks.append(("up", obj, _link_path(links["up"])))
+            if "down" in directions:
+                tasks.extend(
+                    (rel, obj, _link_path(links[rel]))
+                    for rel in child_links
+                    if rel in links
+                )
+        frontier = []
+        for (rel, obj, _), data, error in bulk.run_bounded(
+            fetch, tasks, GRAPH_CONCURRENCY
+        ):
+            node = nodes[str(obj["id"])]
+            if error:
+                node.setdefault("errors", {})[rel] = str(error)
+                continue
+            if rel == "up":
+                related = [data]
+                node["parent"] = data["id"]
+            else:
+                related = data["data"][:child_limit]
+                node["children"][rel] = [child["id"] for child in related]
+                if len(data["data"]) > child_limit:
+                    node["truncated"].append(rel)
+            for other in related:
+                if str(other["id"]) in nodes:
+                    continue
+                if len(nodes) >= MAX_GRAPH_NODES:
+                    if rel not in node["truncated"]:
+                        node["truncated"].append(rel)
+                    break
+                nodes[str(other["id"])] = _node(other, distance)
+                if rel != "up":
+                    nodes[str(other["id"])]["parent"] = obj["id"]
+                frontier.append((other, ("up",) if rel == "up" else ("down",)))
+    for key, node in nodes.items():
+        _objects.set(
+            (bam_client.principal, key), {"name": node["name"], "type": node["type"]}
+        )
+    return {"root": root["id"], "nodes": nodes}
+
 
 @bp.route("/")
 @page_exc_handler(default_message='Failed to load page "Get object details".')
@@ -42,10 +257,7 @@ def page():
 
     :return: Response with page HTML.
     """
-    return send_from_directory(
-        os.path.dirname(os.path.abspath(str(__file__))),
-        "html/getObjectDetails/index.html",
-    )
+    return static.send_page(WORKFLOW_DIR, "html/getObjectDetails/index.html")
 
 
 @bp.route("/object", methods=["GET"])
@@ -57,7 +269,7 @@ def get_object_details():
     Get object name and type by ID.
     """
     object_id = request.args["objectId"]
-    rdata = g.user.bam_api.v2.http_get(f"/?filter=id:{object_id}")["data"]
+    rdata = bam.client().http_get(f"/?filter=id:{object_id}")["data"]
     if rdata:
         data = {
             "name": rdata[0]["name"],
@@ -66,3 +278,52 @@ def get_object_details():
     else:
         data = None
     return {"data": data}
+
+
+@bp.route("/objects", methods=["POST"])
+@no_cache
+@api_exc_handler(default_message="Failed to retrieve object details from BAM.")
+@require_permission("get_object_details")
+def get_objects_details():
+    """
+    Get object names and types for a comma-separated list of IDs.
+    """
+    object_ids = parse_object_ids(request.form["objectIds"])
+    return {"data": lookup_objects(object_ids)}
+
+
+@bp.route("/object/graph", methods=["GET"])
+@no_cache
+@api_exc_handler(default_message="Failed to retrieve object details from BAM.")
+@require_permission("get_object_details")
+def get_object_graph():
+    """
+    Get an object with its ancestors and descendants up to ``depth`` links away.
+    The optional ``links`` is a comma-separated list of the collections of
+    children to follow and ``childLimit`` the number of children listed per
+    collection.
+    """
+    object_id = request.args.get("objectId", "")
+    if not object_id.isdigit():
+        raise BadRequestError(
+            "Object ID is not valid",
+            details=FieldError("objectId", "Please provide an object ID."),
+        )
+    depth = request.args.get("depth", 1, type=int)
+    if not 0 <= depth <= MAX_GRAPH_DEPTH:
+        raise BadRequestError(
+            "Depth is not valid",
+            details=FieldError("depth", f"Use a depth from 0 to {MAX_GRAPH_DEPTH}."),
+        )
+    links = request.args.get("links")
+    child_links = links.split(",") if links else DEFAULT_CHILD_LINKS
+    if not all(rel.isidentifier() for rel in child_links):
+        raise BadRequestError(
+            "Links are not valid",
+            details=FieldError(
+                "links", "Please provide a comma-separated list of link names."
+            ),
+        )
+    child_limit = request.args.get("childLimit", DEFAULT_CHILD_LIMIT, type=int)
+    child_limit = max(1, min(child_limit, MAX_CHILD_LIMIT))
+    return {"data": expand_graph(object_id, depth, child_links, child_limit)}
@@ -18,9 +18,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 """Routes and back-end implementation of workflow "update_text_record"."""
+import itertools
 import os
 
-from bluecat.gateway.errors import PublicError  # pylint: disable=import-error
+# pylint: disable=import-error
+from bluecat.gateway.errors import BadRequestError, FieldError, PublicError
 
 # pylint: disable=import-error
 from bluecat.gateway.decorators import (
@@ -32,9 +34,209 @@ from bluecat.gateway.decorators import (
 # pylint: disable=import-error
 from bluecat.util import no_cache
 
+from ..common import bam, bulk, hierarchy, jobs, limiter, paging, search, static
+from ..common.etag import conditional
+from ..common.records import (
+    ACTIONS,
+    TXT_RECORD_PARAMS,
+    apply_reconcile,
+    build_text_record,
+    index_records,
+    iter_txt_records,
+    plan_reconcile,
+    record_deleted,
+    record_saved,
+    sort_for_display,
+    stream_record_changes,
+    validate_row,
+)
 from .base import bp
 
-from flask import g, request, send_from_directory
+from flask import request
+
+WORKFLOW_DIR = os.path.dirname(os.path.abspath(str(__file__)))
+
+static.register_assets(bp, WORKFLOW_DIR)
+
+
+def get_txt_records(zone_id):
+    """
+    Get the TXT records under a zone, and index them for rejecting duplicate
+    additions.
+
+    :param zone_id: The ID of the zone.
+    :return: The list of records, sorted by name in descending order.
+    """
+    txt_records = list(iter_txt_records(zone_id))
+    index_records(zone_id, txt_records)
+    return sort_for_display(txt_records)
+
+
+def list_txt_records():
+    """
+    Get the TXT records under the zone specified in the request. If the request
+    contains a ``cursor``, only one page of records is returned, along with the
+    cursor for the next page. Pages are in the order of the record IDs, so that
+    no record is repeated or skipped.
+
+    :return: The records in a JSON-serializable form.
+    """
+    zone_id = request.values["zone"]
+    if "cursor" not in request.values:
+        return {"records": get_txt_records(zone_id)}
+    records, next_cursor = paging.get_page(
+        f"/zones/{zone_id}/resourceRecords",
+        TXT_RECORD_PARAMS,
+        request.values["cursor"],
+        request.values.get("limit", type=int),
+    )
+    return {"records": records, "next_cursor": next_cursor}
+
+
+#: The columns of exported TXT records.
+EXPORT_FIELDS = ("zone", "id", "name", "text")
+
+#: The supported formats of exported TXT records.
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def iter_zone_export(zones, concurrency):
+    """
+    Iterate over the TXT records under zones, in the order of the zones. The first
+    page of the following zones and the further pages of the current zone are
+    fetched concurrently.
+
+    :param zones: The zones, each with an ``id`` and ``name``.
+    :param concurrency: The maximum number of concurrent requests per level.
+    :return: A generator of records, each with the name of its ``zone``.
+    """
+    bam_client = bam.client()
+    page_size = paging.DEFAULT_PAGE_SIZE
+
+    def first_page(zone):
+        return bam_client.http_get(
+            f"/zones/{zone['id']}/resourceRecords",
+            params={**TXT_RECORD_PARAMS, "offset": "0", "limit": str(page_size)},
+        )["data"]
+
+    for zone, records, error in bulk.run_bounded(first_page, zones, concurrency):
+        if error:
+            raise error
+        if len(records) == page_size:
+            records = itertools.chain(
+                records,
+                paging.iter_resources_concurrently(
+                    f"/zones/{zone['id']}/resourceRecords",
+                    TXT_RECORD_PARAMS,
+                    page_size=page_size,
+                    offset=page_size,
+                    concurrency=concurrency,
+                ),
+            )
+        for record in records:
+            yield {"zone": zone["name"], **record}
+
+
+def export_txt_records():
+    """
+    Stream the TXT records under the zone, or all zones of the view, specified in
+    the request as CSV or newline-delimited JSON, as selected by ``format``.
+
+    :return: The streamed response.
+    """
+    fmt = request.args.get("format", "csv").lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequestError(
+            "Unsupported export format",
+            details=FieldError("format", "Please select CSV or JSONL."),
+        )
+    concurrency = bulk.get_concurrency(request.args.get("concurrency", type=int))
+    if "zone" in request.args:
+        zone_id = request.args["zone"]
+        zones = [{"id": zone_id, "name": request.args.get("zoneName", zone_id)}]
+        filename = f"txt-records-zone-{zone_id}.{fmt}"
+    elif "view" in request.args:
+        zones = hierarchy.get_zones(request.args["view"])
+        filename = f"txt-records-view-{request.args['view']}.{fmt}"
+    else:
+        raise BadRequestError(
+            "Zone or view is not specified",
+            details=FieldError("zone", "Please select a zone or a view."),
+        )
+    records = iter_zone_export(zones, concurrency)
+    if fmt == "csv":
+        return paging.csv_response(records, EXPORT_FIELDS, filename)
+    return paging.ndjson_response(records, filename)
+
+
+def record_changes():
+    """
+    Stream the changes to the TXT records under the zone specified in the
+    request as Server-Sent Events.
+
+    :return: The streamed response.
+    """
+    zone_id = request.args.get("zone")
+    if not zone_id:
+        raise BadRequestError(
+            "Zone is not specified",
+            details=FieldError("zone", "Please select a zone."),
+        )
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "lastEventId"
+    )
+    return stream_record_changes(zone_id, last_event_id)
+
+
+def update_text_record(bam_client, record_id, headers, body):
+    """
+    Update a text record.
+
+    :param bam_client: The BAM client of the user.
+    :param record_id: The ID of the record.
+    :param headers: The request headers.
+    :param body: The new state of the record.
+    :return: The result in a JSON-serializable form.
+    """
+    try:
+        rdata = bam_client.http_put(
+            f"/resourceRecords/{record_id}",
+            headers=headers,
+            params={},
+            json=body,
+        )
+    except Exception as e:
+        raise PublicError(str(e)) from e
+    record_saved(
+        None,
+        {"id": record_id, "name": body["name"], "text": body["text"]},
+        bam_client.principal,
+    )
+
+    return {
+        "message": "Record successfully updated",
+        "data": rdata,
+    }
+
+
+def delete_text_record(bam_client, record_id):
+    """
+    Delete a text record.
+
+    :param bam_client: The BAM client of the user.
+    :param record_id: The ID of the record.
+    :return: The result in a JSON-serializable form.
+    """
+    bam_client.http_delete(
+        f"/resourceRecords/{record_id}",
+    )
+    record_deleted(record_id, bam_client.principal)
+    return {"message": "Deleted record successfully."}
+
+
+SEARCH_LOADERS = {**search.HIERARCHY_LOADERS, "records": get_txt_records}
 
 
 # Update text record section
@@ -49,85 +251,113 @@ def page():
 
     :return: Response with the page's HTML.
     """
-    return send_from_directory(
-        os.path.dirname(os.path.abspath(str(__file__))),
-        "html/updateTextRecord/index.html",
-    )
+    hierarchy.warm()
+    return static.send_page(WORKFLOW_DIR, "html/updateTextRecord/index.html")
 
 
 @bp.route("/update_text_record/configurations")
 @api_exc_handler(default_message="Failed to get configurations available on BAM.")
 @require_permission("update_text_record")
+@conditional
 def utr_get_configurations():
     """
     Get configurations for the dropDown in the Update text recordpage
     """
-    rdata = g.user.bam_api.v2.http_get(
-        "/configurations",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    configurations = rdata["data"]
-    return {"configurations": configurations}
+    return {"configurations": hierarchy.get_configurations()}
 
 
-@bp.route("/update_text_record/views", methods=["POST"])
+@bp.route("/update_text_record/views", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get views available on BAM.")
 @require_permission("update_text_record")
+@conditional
 def utr_get_views():
     """
     Get views under the selected configuration in the Update text record page
     """
-    configuration_id = request.form["configuration"]
-
-    rdata = g.user.bam_api.v2.http_get(
-        f"/configurations/{configuration_id}/views",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    views = rdata["data"]
-    return {"views": views}
+    configuration_id = request.values["configuration"]
+    hierarchy.remember_configuration(configuration_id)
+    return {"views": hierarchy.get_views(configuration_id)}
 
 
-@bp.route("/update_text_record/zones", methods=["POST"])
+@bp.route("/update_text_record/zones", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get zones available on BAM.")
 @require_permission("update_text_record")
+@conditional
 def utr_get_zones():
     """
     Get zones under the selected view in the Update text record page
     """
-    view_id = request.form["view"]
-    rdata = g.user.bam_api.v2.http_get(
-        f"/views/{view_id}/zones",
-        params={
-            "fields": "id,name",
-            "orderBy": "desc(name)",
-            "limit": "9999",
-            "filter": "type:eq('Zone')",
-        },
-    )
-    zones = rdata["data"]
-    return {"zones": zones}
+    view_id = request.values["view"]
+    return {"zones": hierarchy.get_zones(view_id)}
 
 
-@bp.route("/update_text_record/records", methods=["POST"])
+@bp.route("/update_text_record/hierarchy")
+@api_exc_handler(default_message="Failed to get the hierarchy of zones on BAM.")
+@require_permission("update_text_record")
+@conditional
+def utr_get_hierarchy():
+    """
+    Get configurations, views and zones for the Update text record page in a
+    single request
+    """
+    return hierarchy.tree_request()
+
+
+@bp.route("/update_text_record/records", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get records available on BAM.")
 @require_permission("update_text_record")
+@conditional
 def utr_get_records():
     """
     Get records under the selected zone in the Update text record page
     """
-    zone_id = request.form["zone"]
-    rdata = g.user.bam_api.v2.http_get(
-        f"/zones/{zone_id}/resourceRecords",
-        params={
-            "fields": "id,name,text",
-            "filter": "type:eq('TXTRecord')",
-            "orderBy": "desc(name)",
-            "limit": "9999",
-        },
-    )
+    return list_txt_records()
 
-    records = rdata["data"]
-    return {"records": records}
+
+@bp.route("/update_text_record/records/stream", methods=["POST"])
+@api_exc_handler(default_message="Failed to get records available on BAM.")
+@require_permission("update_text_record")
+def utr_stream_records():
+    """
+    Stream records under the selected zone in the Update text record page as
+    newline-delimited JSON
+    """
+    return paging.ndjson_response(iter_txt_records(request.form["zone"]))
+
+
+@bp.route("/update_text_record/records/export")
+@api_exc_handler(default_message="Failed to export records available on BAM.")
+@require_permission("update_text_record")
+@bam.use_lane(limiter.BULK)
+def utr_export_records():
+    """
+    Export records under the selected zone or view in the Update text record
+    page as CSV or newline-delimited JSON
+    """
+    return export_txt_records()
+
+
+@bp.route("/update_text_record/records/changes")
+@api_exc_handler(default_message="Failed to get changes to records on BAM.")
+@require_permission("update_text_record")
+@bam.use_lane(limiter.BULK)
+def utr_record_changes():
+    """
+    Stream the changes to records under the selected zone in the Update text record
+    page as Server-Sent Events
+    """
+    return record_changes()
+
+
+@bp.route("/update_text_record/search")
+@api_exc_handler(default_message="Failed to search objects available on BAM.")
+@require_permission("update_text_record")
+def utr_search():
+    """
+    Search configurations, views, zones or records by name in the Update text
+    record page
+    """
+    return search.search_request(SEARCH_LOADERS)
 
 
 @bp.route("/update_text_record/update", methods=["POST"])
@@ -136,7 +366,7 @@ def utr_get_records():
 @require_permission("update_text_record")
 def api_post_update_text_record():
     """
-    update the text record
+    update the text record, in the background if ``async`` is set
     """
 
     zone_name = request.form["zoneName"]
@@ -144,37 +374,92 @@ def api_post_update_text_record():
     new_name = request.form["newName"]
     new_text = request.form["newText"]
 
-    headers = {}
-    if new_name:
-        absolute_name = new_name + "." + zone_name
-    else:
-        absolute_name = None
-        headers = {"x-bcn-same-as-zone": "true"}
-
-    body = {
-        "id": record_id,
-        "type": "TXTRecord",
-        "name": new_name if new_name else None,
-        "text": new_text if new_text else None,
-        "absoluteName": absolute_name,
-    }
+    headers, body = build_text_record(new_name, new_text, zone_name, record_id)
 
-    try:
-        rdata = g.user.bam_api.v2.http_put(
-            f"/resourceRecords/{record_id}",
-            headers=headers,
-            params={},
-            json=body,
-        )
-    except Exception as e:
-        raise PublicError(str(e)) from e
+    return jobs.run(
+        "update_text_record",
+        update_text_record,
+        bam.client(),
+        record_id,
+        headers,
+        body,
+    )
 
+
+@bp.route("/update_text_record/reconcile", methods=["POST"])
+@no_cache
+@api_exc_handler(default_message="Failed to reconcile text records.")
+@require_permission("add_text_record")
+@require_permission("update_text_record")
+@require_permission("delete_text_record")
+@bam.use_lane(limiter.BULK)
+def utr_reconcile_text_records():
+    """
+    Make the TXT records of ``zone`` match the desired set of records in an
+    uploaded CSV or JSONL file, whose rows have a ``name`` and a ``text``. Only
+    the records that differ are added, updated or deleted, concurrently, so the
+    user needs the permissions of all three. If ``dryRun`` is set, the plan is
+    returned without performing it.
+    """
+    zone_id = request.form.get("zone")
+    zone_name = request.form.get("zoneName")
+    if not zone_id or not zone_name:
+        raise BadRequestError(
+            "Zone is not specified",
+            details=FieldError("zone", "Please select a zone."),
+        )
+    upload = request.files.get("file")
+    if not upload:
+        raise BadRequestError(
+            "File is not specified",
+            details=FieldError("file", "Please select a file."),
+        )
+    fmt = bulk.get_upload_format(upload, request.form.get("format"))
+    concurrency = bulk.get_concurrency(request.form.get("concurrency", type=int))
+
+    # The whole file is validated first, since any record missing from it would
+    # be deleted.
+    desired = []
+    for number, row in bulk.iter_rows(upload, fmt):
+        if isinstance(row, Exception):
+            raise BadRequestError(
+                f"Row {number} is not valid: {row}",
+                details=FieldError("file", "Please fix the file."),
+            )
+        try:
+            validate_row(row)
+        except BadRequestError as e:
+            raise BadRequestError(
+                f"Row {number} is not valid: {e}",
+                details=FieldError("file", "Please fix the file."),
+            ) from e
+        desired.append((row.get("name") or "", row["text"]))
+
+    plan = plan_reconcile(get_txt_records(zone_id), desired)
+    writes = sum(len(plan[action]) for action in ACTIONS)
+    if request.form.get("dryRun", "").lower() in ("1", "true", "yes"):
+        return {"message": f"{writes} changes are needed.", "plan": plan}
+
+    failed = apply_reconcile(bam.client(), zone_id, zone_name, plan, concurrency)
     return {
-        "message": "Record successfully updated",
-        "data": rdata,
+        "message": f"Made {writes - len(failed)} of {writes} changes.",
+        "plan": plan,
+        "failed": failed,
     }
 
 
+@bp.route("/update_text_record/jobs/<job_id>")
+@no_cache
+@api_exc_handler(default_message="Failed to get the status of the operation.")
+@require_permission("update_text_record")
+def utr_get_job(job_id):
+    """
+    Get the status of an operation requested with ``async`` set in the Update
+    text record page
+    """
+    return jobs.status(job_id)
+
+
 # Delete text record section
 
 
@@ -187,85 +472,112 @@ def delete_text_record_page():
 
     :return: Response with the page's HTML.
     """
-    return send_from_directory(
-        os.path.dirname(os.path.abspath(str(__file__))),
-        "html/deleteTextRecord/index.html",
-    )
+    hierarchy.warm()
+    return static.send_page(WORKFLOW_DIR, "html/deleteTextRecord/index.html")
 
 
 @bp.route("/delete_text_record/configurations")
 @api_exc_handler(default_message="Failed to get configurations available on BAM.")
 @require_permission("delete_text_record")
+@conditional
 def dtr_get_configurations():
     """
     Get configurations for the dropDown in Delete text record page
     """
-    rdata = g.user.bam_api.v2.http_get(
-        "/configurations",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    configurations = rdata["data"]
-    return {"configurations": configurations}
+    return {"configurations": hierarchy.get_configurations()}
 
 
-@bp.route("/delete_text_record/views", methods=["POST"])
+@bp.route("/delete_text_record/views", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get views available on BAM.")
 @require_permission("delete_text_record")
+@conditional
 def dtr_get_views():
     """
     Get views under the selected configuration in Delete text record page
     """
-    configuration_id = request.form["configuration"]
+    configuration_id = request.values["configuration"]
+    hierarchy.remember_configuration(configuration_id)
+    return {"views": hierarchy.get_views(configuration_id)}
 
-    rdata = g.user.bam_api.v2.http_get(
-        f"/configurations/{configuration_id}/views",
-        params={"fields": "id,name", "orderBy": "desc(name)", "limit": "9999"},
-    )
-    views = rdata["data"]
-    return {"views": views}
 
-
-@bp.route("/delete_text_record/zones", methods=["POST"])
+@bp.route("/delete_text_record/zones", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get zones available on BAM.")
 @require_permission("delete_text_record")
+@conditional
 def dtr_get_zones():
     """
     Get zones under the selected view in Delete text record page
     """
-    view_id = request.form["view"]
-    rdata = g.user.bam_api.v2.http_get(
-        f"/views/{view_id}/zones",
-        params={
-            "fields": "id,name",
-            "orderBy": "desc(name)",
-            "limit": "9999",
-            "filter": "type:eq('Zone')",
-        },
-    )
-    zones = rdata["data"]
-    return {"zones": zones}
+    view_id = request.values["view"]
+    return {"zones": hierarchy.get_zones(view_id)}
 
 
-@bp.route("/delete_text_record/records", methods=["POST"])
+@bp.route("/delete_text_record/hierarchy")
+@api_exc_handler(default_message="Failed to get the hierarchy of zones on BAM.")
+@require_permission("delete_text_record")
+@conditional
+def dtr_get_hierarchy():
+    """
+    Get configurations, views and zones for Delete text record page in a single request
+    """
+    return hierarchy.tree_request()
+
+
+@bp.route("/delete_text_record/records", methods=["GET", "POST"])
 @api_exc_handler(default_message="Failed to get records available on BAM.")
 @require_permission("delete_text_record")
+@conditional
 def dtr_get_records():
     """
     Get records under the selected zone in Delete text record page
     """
-    zone_id = request.form["zone"]
-    rdata = g.user.bam_api.v2.http_get(
-        f"/zones/{zone_id}/resourceRecords",
-        params={
-            "fields": "id,name,text",
-            "filter": "type:eq('TXTRecord')",
-            "orderBy": "desc(name)",
-            "limit": "9999",
-        },
-    )
+    return list_txt_records()
+
+
+@bp.route("/delete_text_record/records/stream", methods=["POST"])
+@api_exc_handler(default_message="Failed to get records available on BAM.")
+@require_permission("delete_text_record")
+def dtr_stream_records():
+    """
+    Stream records under the selected zone in Delete text record page as
+    newline-delimited JSON
+    """
+    return paging.ndjson_response(iter_txt_records(request.form["zone"]))
+
 
-    records = rdata["data"]
-    return {"records": records}
+@bp.route("/delete_text_record/records/export")
+@api_exc_handler(default_message="Failed to export records available on BAM.")
+@require_permission("delete_text_record")
+@bam.use_lane(limiter.BULK)
+def dtr_export_records():
+    """
+    Export records under the selected zone or view in Delete text record page as
+    CSV or newline-delimited JSON
+    """
+    return export_txt_records()
+
+
+@bp.route("/delete_text_record/records/changes")
+@api_exc_handler(default_message="Failed to get changes to records on BAM.")
+@require_permission("delete_text_record")
+@bam.use_lane(limiter.BULK)
+def dtr_record_changes():
+    """
+    Stream the changes to records under the selected zone in the Delete text record
+    page as Server-Sent Events
+    """
+    return record_changes()
+
+
+@bp.route("/delete_text_record/search")
+@api_exc_handler(default_message="Failed to search objects available on BAM.")
+@require_permission("delete_text_record")
+def dtr_search():
+    """
+    Search configurations, views, zones or records by name in Delete text record
+    page
+    """
+    return search.search_request(SEARCH_LOADERS)
 
 
 @bp.route("/delete_text_record/delete/<id>", methods=["DELETE"])
@@ -273,9 +585,89 @@ def dtr_get_records():
 @api_exc_handler(default_message="Failed to delete text record.")
 @require_permission("delete_text_record")
 def dtr_delete_text_record(id):  # pylint: disable=redefined-builtin
-    """Deletes a text record"""
+    """Deletes a text record, in the background if ``async`` is set"""
 
-    g.user.bam_api.v2.http_delete(
-        f"/resourceRecords/{id}",
-    )
-    return {"message": "Deleted record successfully."}
+    return jobs.run("delete_text_record", delete_text_record, bam.client(), id)
+
+
+@bp.route("/delete_text_record/jobs/<job_id>")
+@no_cache
+@api_exc_handler(default_message="Failed to get the status of the operation.")
+@require_permission("delete_text_record")
+def dtr_get_job(job_id):
+    """
+    Get the status of an operation requested with ``async`` set in Delete text
+    record page
+    """
+    return jobs.status(job_id)
+
+
+@bp.route("/delete_text_record/delete", methods=["POST"])
+@no_cache
+@api_exc_handler(default_message="Failed to delete text records.")
+@require_permission("delete_text_record")
+@bam.use_lane(limiter.BULK)
+def dtr_bulk_delete_text_records():
+    """
+    Deletes text records, either the ones listed by ID in ``recordIDs`` (comma
+    separated) or the ones under ``zone`` whose name starts with ``namePrefix``.
+    All records of the zone are only deleted if ``all`` is set instead of a
+    prefix. The records are deleted concurrently and failures are reported per
+    record.
+    """
+    if request.form.get("recordIDs"):
+        record_ids = list(
+            dict.fromkeys(
+                record_id.strip()
+                for record_id in request.form["recordIDs"].split(",")
+                if record_id.strip()
+            )
+        )
+        # The IDs become part of the path of the request to BAM.
+        if not all(record_id.isdigit() for record_id in record_ids):
+            raise BadRequestError(
+                "Record IDs are not valid",
+                details=FieldError(
+                    "recordIDs", "Please provide a comma-separated list of record IDs."
+                ),
+            )
+    elif request.form.get("zone"):
+        name_prefix = request.form.get("namePrefix", "")
+        delete_all = request.form.get("all", "").lower() in ("1", "true", "yes")
+        if not name_prefix and not delete_all:
+            raise BadRequestError(
+                "Name prefix is not specified",
+                details=FieldError(
+                    "namePrefix",
+                    "Please provide a name prefix, or select all records of the zone.",
+                ),
+            )
+        record_ids = [
+            str(record["id"])
+            for record in iter_txt_records(request.form["zone"])
+            if (record.get("name") or "").startswith(name_prefix)
+        ]
+    else:
+        raise BadRequestError(
+            "Records are not specified",
+            details=FieldError("recordIDs", "Please select records or a zone."),
+        )
+    concurrency = bulk.get_concurrency(request.form.get("concurrency", type=int))
+    bam_client = bam.client()
+
+    def delete(record_id):
+        bam_client.http_delete(f"/resourceRecords/{record_id}")
+        record_deleted(record_id, bam_client.principal)
+
+    deleted = []
+    failed = []
+    for record_id, _, error in bulk.run_bounded(delete, record_ids, concurrency):
+        if error:
+            failed.append({"id": record_id, "error": str(error)})
+        else:
+            deleted.append(record_id)
+    return {
+        "message": f"Deleted {len(deleted)} of {len(record_ids)} records.",
+        "deleted": deleted,
+        "failed": failed,
+    }